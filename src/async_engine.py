@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.metrics import metrics
+from src.rate_limit import RateLimiter, estimate_tokens
+from src.retry import CircuitBreaker, backoff_delay, is_transient
+
+
+class AsyncExtractionEngine:
+    """Keeps up to `concurrency` batches in flight through `chain.ainvoke`.
+
+    Batches are lists of CV indices and `prompt_for` builds the prompt of a
+    batch. Rate limit and server errors are retried with jittered backoff;
+    any other failure splits the batch in half, down to single CVs, so one
+    bad CV does not take its neighbours with it. Backoff sleeps happen
+    outside the semaphore and never hold up other requests.
+    """
+
+    def __init__(self, chain, prompt_for: Callable[[List[int]], str], concurrency: int = 4,
+                 rate_limiter: Optional[RateLimiter] = None, max_retries: int = 3,
+                 backoff_base: float = 1.0, backoff_cap: float = 60.0,
+                 breaker: Optional[CircuitBreaker] = None, logger: Optional[logging.Logger] = None,
+                 on_result: Optional[Callable[[List[int], Dict[str, Any]], None]] = None):
+        self.chain = chain
+        self.prompt_for = prompt_for
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = breaker or CircuitBreaker()
+        self.logger = logger or logging.getLogger(__name__)
+        # When set, each result is handed over as soon as its batch finishes instead of being collected
+        self.on_result = on_result
+        self.failures: Dict[int, str] = {}
+        self.retries = 0
+        self.splits = 0
+
+    async def _attempt(self, semaphore: asyncio.Semaphore, indices: List[int]
+                       ) -> Tuple[Optional[Dict[str, Any]], Optional[Exception], bool]:
+        """Send one batch, retrying transient errors.
+
+        Returns (response, last error, whether the last error was transient).
+        """
+        cv_text = self.prompt_for(indices)
+        error = None
+        for attempt in range(1, self.max_retries + 1):
+            await self.breaker.wait()
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(estimate_tokens(cv_text))
+            try:
+                async with semaphore:
+                    metrics.inc("llm_requests_total")
+                    metrics.inc("llm_prompt_characters_total", len(cv_text))
+                    metrics.inc("llm_prompt_tokens_total", estimate_tokens(cv_text))
+                    started = perf_counter()
+                    try:
+                        response = await self.chain.ainvoke({"cv": cv_text})
+                    finally:
+                        metrics.observe("llm_request_seconds", perf_counter() - started)
+                self.breaker.record_success()
+                return response.dict(), None, False
+            except Exception as e:
+                error = e
+                metrics.inc("llm_errors_total")
+                if not is_transient(e):
+                    # Content or validation problem, retrying the same prompt will not help
+                    if len(indices) == 1:
+                        self.logger.error(f"Error on CV {indices[0]}: {e}")
+                    return None, e, False
+                self.breaker.record_failure()
+                self.logger.error(f"Error in batch of {len(indices)} CVs (attempt {attempt}/{self.max_retries}): {e}")
+                if attempt < self.max_retries:
+                    self.retries += 1
+                    metrics.inc("llm_retries_total")
+                    delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+                    self.logger.info(f"Retrying batch in {delay:.1f} seconds...")
+                    await asyncio.sleep(delay)
+        return None, error, True
+
+    async def process_batch(self, semaphore: asyncio.Semaphore, indices: List[int]
+                            ) -> List[Tuple[List[int], Dict[str, Any]]]:
+        """Send one batch, splitting it on failure; returns the successful (indices, response) pairs."""
+        response, error, transient = await self._attempt(semaphore, indices)
+        if response is not None:
+            if self.on_result is not None:
+                self.on_result(indices, response)
+                return []
+            return [(indices, response)]
+        if transient or len(indices) == 1:
+            # Splitting would only multiply requests against an overloaded API
+            kind = "transient error" if transient else "error"
+            for index in indices:
+                self.failures[index] = f"{kind}: {type(error).__name__}: {error}"
+            return []
+        self.splits += 1
+        metrics.inc("llm_batch_splits_total")
+        middle = len(indices) // 2
+        self.logger.warning(f"Batch of {len(indices)} CVs failed ({error}), splitting it in two")
+        halves = await asyncio.gather(
+            self.process_batch(semaphore, indices[:middle]),
+            self.process_batch(semaphore, indices[middle:]),
+        )
+        return halves[0] + halves[1]
+
+    async def run(self, batches: List[List[int]]) -> List[Tuple[List[int], Dict[str, Any]]]:
+        """Send every batch and return (cv indices, response) for each successful request.
+
+        Results are ordered by their first CV; CVs that failed even on their
+        own are listed in self.failures with the reason.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        self.failures = {}
+        start = perf_counter()
+        results = await asyncio.gather(*[self.process_batch(semaphore, indices) for indices in batches])
+        elapsed = perf_counter() - start
+        self.logger.info(f"Dispatched {len(batches)} batches with concurrency {self.concurrency} in {elapsed:.2f}s "
+                         f"({self.retries} retries, {self.splits} splits, {len(self.failures)} failed CVs)")
+        return sorted((result for batch in results for result in batch), key=lambda result: result[0][0])
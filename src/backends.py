@@ -0,0 +1,37 @@
+import os
+from typing import Any, Callable, Dict
+
+
+def gemini_llm(model: str = None, api_key: str = None, **options):
+    """ChatGoogleGenerativeAI configured from MODEL / GEMINI_API_KEY unless given."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=model or os.environ["MODEL"],
+        temperature=0.2,
+        max_tokens=None,
+        timeout=None,
+        max_retries=2,
+        api_key=api_key or os.environ["GEMINI_API_KEY"],
+        **options
+    )
+
+
+def fake_llm(**options):
+    """Deterministic local model, see src.fake_llm.FakeChatModel for the options."""
+    from src.fake_llm import FakeChatModel
+
+    return FakeChatModel(**options)
+
+
+BACKENDS: Dict[str, Callable[..., Any]] = {
+    "gemini": gemini_llm,
+    "fake": fake_llm,
+}
+
+
+def get_llm(backend: str = "gemini", **options):
+    """Build the chat model of the named backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend {backend!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[backend](**options)
@@ -0,0 +1,128 @@
+import logging
+import re
+from bisect import bisect_left, insort
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.rate_limit import estimate_tokens
+
+CV_TAG = re.compile(r'<cv id="([^"]+)">\s*(.*?)\s*</cv>', re.DOTALL)
+
+
+def cv_id(index: int) -> str:
+    """Stable ID of the index-th CV of a run, used to tag it in the prompt."""
+    return f"cv-{index}"
+
+
+def tag_cv(index: int, text: str) -> str:
+    return f'<cv id="{cv_id(index)}">\n{text}\n</cv>'
+
+
+def split_tagged_cvs(text: str) -> List[Tuple[str, str]]:
+    """Return (id, text) for every tagged CV of a batch prompt."""
+    return CV_TAG.findall(text)
+
+
+def plan_batches(token_counts: List[int], token_budget: int, max_cvs: Optional[int] = None) -> List[List[int]]:
+    """Pack CVs into batches of at most token_budget tokens (best-fit decreasing).
+
+    Open batches are kept sorted by remaining tokens, so each CV finds the
+    tightest batch it fits in with one bisection: O(n log n) rather than a scan
+    of every open batch. A CV larger than the budget gets a batch of its own.
+    Batches are returned ordered by their first CV, with indices sorted, so the
+    plan is deterministic.
+    """
+    bins: List[List[int]] = []
+    # (remaining tokens, bin) of every batch that can still take a CV
+    open_bins: List[Tuple[int, int]] = []
+    order = sorted(range(len(token_counts)), key=lambda i: (-token_counts[i], i))
+    for i in order:
+        tokens = token_counts[i]
+        pos = bisect_left(open_bins, (tokens, -1))
+        if pos < len(open_bins):
+            remaining, b = open_bins.pop(pos)
+            bins[b].append(i)
+        else:
+            remaining, b = token_budget, len(bins)
+            bins.append([i])
+        remaining -= tokens
+        if remaining > 0 and (max_cvs is None or len(bins[b]) < max_cvs):
+            insort(open_bins, (remaining, b))
+    return sorted((sorted(b) for b in bins), key=lambda b: b[0])
+
+
+def match_by_id(indices: List[int], candidates: List[Dict[str, Any]]
+                ) -> Tuple[Dict[int, Dict[str, Any]], List[Dict[str, Any]], List[int]]:
+    """Map a batch's candidates back onto its CV indices through their cv_id.
+
+    Returns (matched, unmatched candidates, CV indices with no candidate).
+    A CV is only matched when exactly one candidate carries its ID.
+    """
+    expected = {cv_id(i): i for i in indices}
+    by_id: Dict[str, List[Dict[str, Any]]] = {}
+    unmatched = []
+    for candidate in candidates:
+        index = expected.get(candidate.get("cv_id"))
+        if index is None:
+            unmatched.append(candidate)
+        else:
+            by_id.setdefault(candidate["cv_id"], []).append(candidate)
+
+    matched = {}
+    for key, found in by_id.items():
+        if len(found) == 1:
+            matched[expected[key]] = {k: v for k, v in found[0].items() if k != "cv_id"}
+        else:
+            unmatched.extend(found)
+    missing = [i for i in indices if i not in matched]
+    return matched, unmatched, missing
+
+
+def compare_with_fixed(token_counts: List[int], token_budget: int, max_cvs: Optional[int] = None,
+                       batch_size: int = 3, prompt_overhead: int = 0) -> Dict[str, Any]:
+    """Requests and prompt tokens of the planner against fixed-size batching."""
+    start = perf_counter()
+    planned = plan_batches(token_counts, token_budget, max_cvs)
+    plan_seconds = perf_counter() - start
+    fixed = [list(range(i, min(i + batch_size, len(token_counts)))) for i in range(0, len(token_counts), batch_size)]
+
+    def summary(batches):
+        loads = [sum(token_counts[i] for i in b) for b in batches]
+        return {
+            "requests": len(batches),
+            "tokens": sum(loads) + prompt_overhead * len(batches),
+            "max_batch_tokens": max(loads, default=0),
+            "over_budget": sum(1 for load in loads if load > token_budget),
+        }
+
+    planned_summary, fixed_summary = summary(planned), summary(fixed)
+    return {
+        "cvs": len(token_counts),
+        "token_budget": token_budget,
+        "plan_seconds": round(plan_seconds, 4),
+        "planned": planned_summary,
+        "fixed": fixed_summary,
+        "requests_saved": fixed_summary["requests"] - planned_summary["requests"],
+        "tokens_saved": fixed_summary["tokens"] - planned_summary["tokens"],
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import json
+
+    from src.init_agent import read_pdf_text
+
+    parser = argparse.ArgumentParser(description="Compare token-budget batching with fixed batches of 3")
+    parser.add_argument("path", help="Directory of benchmark PDF files")
+    parser.add_argument("--token_budget", type=int, default=8000)
+    parser.add_argument("--max_batch_cvs", type=int, default=10)
+    parser.add_argument("--prompt_overhead", type=int, default=400, help="Estimated system prompt tokens per request")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    texts = [read_pdf_text(file)[1] for file in sorted(glob.glob(f"{args.path}/*.pdf"))]
+    counts = [estimate_tokens(tag_cv(i, text)) for i, text in enumerate(texts)]
+    print(json.dumps(compare_with_fixed(counts, args.token_budget, args.max_batch_cvs,
+                                        prompt_overhead=args.prompt_overhead), indent=2))
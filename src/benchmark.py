@@ -0,0 +1,110 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, Dict, Optional
+
+from src.candidate_store import load_candidates
+from src.init_agent import ExtractAgent
+from src.synthetic_cvs import generate_corpus
+
+
+@contextmanager
+def timed(stages: Dict[str, Dict[str, Any]], stage: str):
+    start = perf_counter()
+    yield stages.setdefault(stage, {})
+    stages[stage]["seconds"] = round(perf_counter() - start, 4)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(corpus_dir: str, latency: float = 0.0, latency_per_1k_tokens: float = 0.0,
+                  error_rate: float = 0.0, concurrency: int = 8, token_budget: int = 8000,
+                  parallel_read: bool = False, report_path: Optional[str] = None) -> Dict[str, Any]:
+    """Time every stage of an offline run over corpus_dir against the fake backend."""
+    agent = ExtractAgent(backend="fake", concurrency=concurrency, token_budget=token_budget,
+                         parallel_read=parallel_read, backoff_base=0.01,
+                         backend_options={"latency": latency, "latency_per_1k_tokens": latency_per_1k_tokens,
+                                          "error_rate": error_rate})
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    with timed(stages, "pdf_parsing") as stage:
+        texts = agent.get_pdfs_content(corpus_dir)
+        stage["files"] = len(texts)
+        stage["characters"] = sum(len(text) for text in texts)
+
+    with timed(stages, "batching") as stage:
+        batches = agent.make_batches(texts)
+        stage["requests"] = len(batches)
+
+    with timed(stages, "llm_dispatch") as stage:
+        results = asyncio.run(agent.ainvoke_batches(texts, batches))
+        stage["model_calls"] = agent.llm.calls
+        stage["failed_cvs"] = len(agent.failures)
+
+    with timed(stages, "get_data_as_dict") as stage:
+        matched, unmatched, _ = agent.match_candidates(results)
+        data = agent.get_data_as_dict([{"candidates": [matched[i] for i in sorted(matched)] + unmatched}])
+        stage["rows"] = len(data["age"])
+
+    if report_path:
+        # The report stage reads the candidate file back, exactly as main.py does
+        from src.pdf_build import create_survey_report
+
+        agent.data_path = os.path.splitext(report_path)[0] + ".arrow"
+        agent.save_data([{"candidates": [matched[i] for i in sorted(matched)] + unmatched}])
+        with timed(stages, "create_survey_report") as stage:
+            create_survey_report(load_candidates(agent.data_path), report_path)
+            stage["bytes"] = os.path.getsize(report_path)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "params": {
+            "corpus": corpus_dir, "cvs": len(texts), "latency": latency,
+            "latency_per_1k_tokens": latency_per_1k_tokens, "error_rate": error_rate,
+            "concurrency": concurrency, "token_budget": token_budget, "parallel_read": parallel_read,
+        },
+        "stages": stages,
+        "total_seconds": round(sum(stage["seconds"] for stage in stages.values()), 4),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline benchmark of the extraction and report stages")
+    parser.add_argument("--corpus", help="Directory of CV PDFs, generated when empty", default="./bench_cvs")
+    parser.add_argument("--cvs", type=int, help="Synthetic CVs to generate", default=200)
+    parser.add_argument("--min_pages", type=int, default=1)
+    parser.add_argument("--max_pages", type=int, default=3)
+    parser.add_argument("--latency", type=float, help="Fake model seconds per call", default=0.0)
+    parser.add_argument("--latency_per_1k_tokens", type=float, help="Extra fake seconds per 1k prompt tokens", default=0.0)
+    parser.add_argument("--error_rate", type=float, help="Fraction of fake calls failing with 503", default=0.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--token_budget", type=int, default=8000)
+    parser.add_argument("--parallel_read", action="store_true")
+    parser.add_argument("--report", help="Also time create_survey_report into this PDF", default=None)
+    parser.add_argument("--output", help="JSON lines file the result is appended to", default="bench_results.jsonl")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not glob.glob(f"{args.corpus}/*.pdf"):
+        generate_corpus(args.corpus, args.cvs, args.min_pages, args.max_pages)
+
+    result = run_benchmark(args.corpus, args.latency, args.latency_per_1k_tokens, args.error_rate,
+                           args.concurrency, args.token_budget, args.parallel_read, args.report)
+    with open(args.output, "a") as f:
+        f.write(json.dumps(result) + "\n")
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import logging
+import sqlite3
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.metrics import metrics
+
+
+def file_hash(file_path: str) -> str:
+    """sha256 of the raw PDF bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def prompt_fingerprint(prompt, schema) -> str:
+    """Hash of the prompt messages and the output schema.
+
+    Any edit to the prompt in ExtractAgent.__init__ or to CandidateInfo changes
+    the fingerprint, so old cache entries simply stop matching.
+    """
+    payload = json.dumps({
+        "prompt": [[type(m).__name__, m.prompt.template] for m in prompt.messages],
+        "schema": schema.model_json_schema(),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class ExtractionCache:
+    """SQLite store of validated CandidateInfo dicts keyed by PDF hash, model and fingerprint.
+
+    Entries are evicted least-recently-used once more than max_entries are stored.
+    """
+
+    def __init__(self, path: str = "./.cv_cache.sqlite", max_entries: int = 100_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.touched: List[Tuple[float, str, str, str]] = []
+        self.logger = logging.getLogger(__name__)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS candidates (
+                pdf_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                data TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (pdf_hash, model, fingerprint)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON candidates (last_used)")
+        self.conn.commit()
+
+    def get(self, pdf_hash: str, model: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Return the cached candidate or None, counting the hit or miss.
+
+        Hits are only marked used here; touch() writes last_used for all of them in one commit.
+        """
+        key = (pdf_hash, model, fingerprint)
+        row = self.conn.execute(
+            "SELECT data FROM candidates WHERE pdf_hash=? AND model=? AND fingerprint=?", key
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            metrics.inc("cache_misses_total")
+            return None
+        self.hits += 1
+        metrics.inc("cache_hits_total")
+        self.touched.append((time(), *key))
+        return json.loads(row[0])
+
+    def touch(self, commit: bool = True):
+        """Write last_used for every hit since the last call, in one statement."""
+        if not self.touched:
+            return
+        self.conn.executemany(
+            "UPDATE candidates SET last_used=? WHERE pdf_hash=? AND model=? AND fingerprint=?", self.touched
+        )
+        self.touched = []
+        if commit:
+            self.conn.commit()
+
+    def put(self, pdf_hash: str, model: str, fingerprint: str, candidate: Dict[str, Any]):
+        """Store a candidate, evicting the least recently used entries above max_entries."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO candidates VALUES (?, ?, ?, ?, ?)",
+            (pdf_hash, model, fingerprint, json.dumps(candidate), time()),
+        )
+        self.touch(commit=False)
+        self.evict()
+        self.conn.commit()
+
+    def evict(self) -> int:
+        overflow = len(self) - self.max_entries
+        if overflow <= 0:
+            return 0
+        metrics.inc("cache_evictions_total", overflow)
+        self.conn.execute(
+            "DELETE FROM candidates WHERE rowid IN "
+            "(SELECT rowid FROM candidates ORDER BY last_used ASC LIMIT ?)", (overflow,)
+        )
+        return overflow
+
+    def invalidate(self, keep_fingerprint: Optional[str] = None) -> int:
+        """Drop every entry, or only those made with another prompt/schema fingerprint."""
+        if keep_fingerprint is None:
+            cursor = self.conn.execute("DELETE FROM candidates")
+        else:
+            cursor = self.conn.execute("DELETE FROM candidates WHERE fingerprint != ?", (keep_fingerprint,))
+        self.conn.commit()
+        self.logger.info(f"Removed {cursor.rowcount} cache entries from {self.path}")
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+
+    def close(self):
+        self.touch()
+        self.conn.close()
+
+
+def figure_key(spec: str, fmt: str, width: int, height: int) -> str:
+    """Hash of a figure's JSON spec (data and layout) and the size and format it is rendered at."""
+    payload = json.dumps({"spec": spec, "format": fmt, "width": width, "height": height}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class FigureCache:
+    """SQLite store of rendered chart images keyed by figure_key.
+
+    Rebuilding a report over unchanged data gets every chart from here instead
+    of kaleido; least recently used images are evicted above max_entries.
+    """
+
+    def __init__(self, path: str = "./.figure_cache.sqlite", max_entries: int = 1_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS figures (
+                key TEXT PRIMARY KEY,
+                image BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_figures_last_used ON figures (last_used)")
+        self.conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self.conn.execute("SELECT image FROM figures WHERE key=?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            metrics.inc("figure_cache_misses_total")
+            return None
+        self.hits += 1
+        metrics.inc("figure_cache_hits_total")
+        self.conn.execute("UPDATE figures SET last_used=? WHERE key=?", (time(), key))
+        self.conn.commit()
+        return row[0]
+
+    def touch(self, commit: bool = True):
+        """Write last_used for every hit since the last call, in one statement."""
+        if not self.touched:
+            return
+        self.conn.executemany(
+            "UPDATE candidates SET last_used=? WHERE pdf_hash=? AND model=? AND fingerprint=?", self.touched
+        )
+        self.touched = []
+        if commit:
+            self.conn.commit()
+
+    def put(self, key: str, image: bytes):
+        self.conn.execute("INSERT OR REPLACE INTO figures VALUES (?, ?, ?)", (key, image, time()))
+        overflow = len(self) - self.max_entries
+        if overflow > 0:
+            self.conn.execute(
+                "DELETE FROM figures WHERE rowid IN "
+                "(SELECT rowid FROM figures ORDER BY last_used ASC LIMIT ?)", (overflow,)
+            )
+        self.conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM figures").fetchone()[0]
+
+    def close(self):
+        self.touch()
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the CV extraction cache")
+    parser.add_argument("command", choices=["stats", "clear"])
+    parser.add_argument("--path", help="Cache database path", default="./.cv_cache.sqlite")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    cache = ExtractionCache(args.path)
+    if args.command == "clear":
+        cache.invalidate()
+    else:
+        print(json.dumps(cache.stats(), indent=2))
+    cache.close()
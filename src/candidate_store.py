@@ -0,0 +1,217 @@
+import logging
+import os
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+CATEGORICAL_FIELDS = ("university", "college", "gender", "degrees")
+
+
+def candidate_schema():
+    """Arrow schema of CandidateInfo: ints stay ints, skills is a list column, low-cardinality fields are categorical."""
+    import pyarrow as pa
+
+    from src.init_agent import CandidateInfo
+
+    fields = []
+    for name, field_info in CandidateInfo.model_fields.items():
+        if field_info.annotation == int:
+            arrow_type = pa.int64()
+        elif field_info.annotation == list[str]:
+            arrow_type = pa.list_(pa.string())
+        elif name in CATEGORICAL_FIELDS:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+class CsvRowWriter:
+    """Appends candidate rows to a CSV file as soon as they are extracted.
+
+    With a summary (src.summary.CandidateSummary), every written chunk is
+    also added to it.
+    """
+
+    def __init__(self, output_path: str, to_columns, summary=None):
+        self.output_path = output_path
+        self.to_columns = to_columns
+        self.summary = summary
+        self.rows = 0
+        self.first_row_at: Optional[float] = None
+
+    def write(self, candidates: List[Dict[str, Any]]):
+        if not candidates:
+            return
+        frame = pd.DataFrame(self.to_columns([{"candidates": candidates}]))
+        if self.summary is not None:
+            self.summary.update(frame)
+        frame.to_csv(self.output_path, index=False, mode="a" if self.rows else "w", header=not self.rows)
+        if self.first_row_at is None:
+            self.first_row_at = perf_counter()
+        self.rows += len(candidates)
+
+    def close(self):
+        if not self.rows:
+            pd.DataFrame(self.to_columns([])).to_csv(self.output_path, index=False)
+
+
+class ArrowRowWriter:
+    """Appends candidate rows to an Arrow IPC (Feather v2) file, one record batch per write.
+
+    Categorical fields share one dictionary across the file, written as
+    deltas, so the whole file reads back as a single categorical column.
+    With a summary, every written chunk is also added to it.
+    """
+
+    def __init__(self, output_path: str, to_columns, summary=None):
+        import pyarrow as pa
+
+        self.output_path = output_path
+        self.to_columns = to_columns
+        self.summary = summary
+        self.rows = 0
+        self.first_row_at: Optional[float] = None
+        self.schema = candidate_schema()
+        self.categories: Dict[str, Dict[str, int]] = {
+            field.name: {} for field in self.schema if pa.types.is_dictionary(field.type)
+        }
+        self.writer = pa.ipc.new_file(output_path, self.schema,
+                                      options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+    def _column(self, field, values: List[Any]):
+        import pyarrow as pa
+
+        if field.name not in self.categories:
+            return pa.array(values, type=field.type)
+        categories = self.categories[field.name]
+        indices = [None if value is None else categories.setdefault(str(value), len(categories))
+                   for value in values]
+        return pa.DictionaryArray.from_arrays(pa.array(indices, type=pa.int32()),
+                                              pa.array(list(categories), type=pa.string()))
+
+    def write(self, candidates: List[Dict[str, Any]]):
+        import pyarrow as pa
+
+        if not candidates:
+            return
+        columns = self.to_columns([{"candidates": candidates}])
+        batch = pa.record_batch([self._column(field, columns[field.name]) for field in self.schema],
+                                schema=self.schema)
+        self.writer.write_batch(batch)
+        if self.summary is not None:
+            self.summary.update(pd.DataFrame(columns))
+        if self.first_row_at is None:
+            self.first_row_at = perf_counter()
+        self.rows += len(candidates)
+
+    def close(self):
+        self.writer.close()
+
+
+def row_writer(output_path: str, to_columns, summary=None):
+    """Arrow writer for .arrow/.feather paths, CSV writer for anything else."""
+    if os.path.splitext(output_path)[1] in (".arrow", ".feather"):
+        return ArrowRowWriter(output_path, to_columns, summary)
+    return CsvRowWriter(output_path, to_columns, summary)
+
+
+def load_candidates(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read extracted candidates, or only `columns` of them, into a DataFrame.
+
+    The Arrow file is memory-mapped, so unselected columns are never read,
+    but the selected ones are converted into pandas memory. Callers that
+    only need statistics should use summary.iter_chunks instead.
+    """
+    if os.path.splitext(path)[1] not in (".arrow", ".feather"):
+        return pd.read_csv(path, usecols=columns)
+    import pyarrow as pa
+
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+
+def concat_candidates(paths: List[str], output_path: str):
+    """Concatenate candidate files of the same format into output_path, in the order given.
+
+    Arrow inputs are memory-mapped and their categorical dictionaries
+    unified, so the output reads back as single categorical columns.
+    """
+    if os.path.splitext(output_path)[1] not in (".arrow", ".feather"):
+        pd.concat([pd.read_csv(path) for path in paths], ignore_index=True).to_csv(output_path, index=False)
+        return
+    import pyarrow as pa
+
+    sources = [pa.memory_map(path) for path in paths]
+    try:
+        tables = [pa.ipc.open_file(source).read_all() for source in sources]
+        table = pa.concat_tables(tables) if tables else candidate_schema().empty_table()
+        with pa.ipc.new_file(output_path, table.schema) as writer:
+            writer.write_table(table.unify_dictionaries())
+    finally:
+        for source in sources:
+            source.close()
+
+
+def export_csv(df: pd.DataFrame, path: str):
+    """Write candidates as CSV, skills in the "['a', 'b']" form the CSV output always had."""
+    if "skills" in df.columns:
+        df = df.assign(skills=[value if isinstance(value, str) else str(list(value)) for value in df["skills"]])
+    df.to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import random
+    import tempfile
+
+    from src.fake_llm import COLLEGES, DEGREES, DEPARTMENTS, GENDERS, SKILLS, UNIVERSITIES
+    from src.report_stats import column_stats
+
+    parser = argparse.ArgumentParser(description="Compare load time and size of the Arrow and CSV candidate files")
+    parser.add_argument("--rows", nargs="+", type=int, default=[100_000, 1_000_000])
+    parser.add_argument("--batch_size", type=int, default=10_000, help="Rows appended per write")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            candidates = [{
+                "university": rng.choice(UNIVERSITIES), "age": rng.randint(21, 45), "college": rng.choice(COLLEGES),
+                "gender": rng.choice(GENDERS), "experience": rng.randint(0, 15),
+                "department": rng.choice(DEPARTMENTS), "degrees": rng.choice(DEGREES),
+                "skills": rng.sample(SKILLS, rng.randint(3, 8)),
+            } for _ in range(rows)]
+
+            def to_columns(batches):
+                columns = {key: [] for key in candidates[0]}
+                for batch in batches:
+                    for candidate in batch["candidates"]:
+                        for key in columns:
+                            columns[key].append(candidate[key])
+                return columns
+
+            result = {"rows": rows}
+            for fmt in ("arrow", "csv"):
+                path = os.path.join(tmp, f"candidates.{fmt}")
+                start = perf_counter()
+                writer = row_writer(path, to_columns)
+                for i in range(0, rows, args.batch_size):
+                    writer.write(candidates[i:i + args.batch_size])
+                writer.close()
+                result[f"{fmt}_write_seconds"] = round(perf_counter() - start, 3)
+                result[f"{fmt}_bytes"] = os.path.getsize(path)
+                start = perf_counter()
+                df = load_candidates(path)
+                result[f"{fmt}_load_seconds"] = round(perf_counter() - start, 3)
+                start = perf_counter()
+                column_stats(df)
+                result[f"{fmt}_stats_seconds"] = round(perf_counter() - start, 3)
+            print(json.dumps(result))
@@ -0,0 +1,178 @@
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Tuple
+
+from src.metrics import metrics
+
+FORMATS = ("png", "svg")
+
+
+def configure_kaleido():
+    """Let kaleido's Chromium use /dev/shm, which is much faster for large images."""
+    import plotly.io as pio
+
+    pio.kaleido.scope.chromium_args = tuple(
+        [arg for arg in pio.kaleido.scope.chromium_args if arg != "--disable-dev-shm-usage"]
+    )
+
+
+def render_figure(fig, fmt: str, width: int, height: int) -> bytes:
+    """Render one figure (a plotly Figure or its JSON) through kaleido."""
+    import plotly.io as pio
+
+    if isinstance(fig, str):
+        fig = pio.from_json(fig)
+    return pio.to_image(fig, format=fmt, width=width, height=height)
+
+
+def _render_in_worker(job: Tuple[str, str, int, int]) -> bytes:
+    return render_figure(*job)
+
+
+class PlotlyRenderer:
+    """Renders all of a report's plotly figures in one go.
+
+    With workers=1 every figure goes through the same warm kaleido/Chromium
+    session; with more, figures are spread over a process pool, each worker
+    keeping its own session for the whole batch. fmt="svg" produces vector
+    charts that ReportLab embeds as drawings instead of multi-megapixel PNGs.
+    """
+
+    def __init__(self, fmt: str = "png", workers: int = 1):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown chart format {fmt!r}, expected one of {FORMATS}")
+        self.fmt = fmt
+        self.workers = workers
+        self.logger = logging.getLogger(__name__)
+        configure_kaleido()
+
+    def render_all(self, figures: List[Tuple[Any, int, int]]) -> List[bytes]:
+        """Render (figure, width_px, height_px) triples, keeping their order."""
+        if not figures:
+            return []
+        with metrics.timer("chart_render_batch"):
+            if self.workers > 1 and len(figures) > 1:
+                jobs = [(fig.to_json(), self.fmt, width, height) for fig, width, height in figures]
+                with ProcessPoolExecutor(min(self.workers, len(figures)), initializer=configure_kaleido) as executor:
+                    images = list(executor.map(_render_in_worker, jobs))
+            else:
+                images = []
+                for fig, width, height in figures:
+                    with metrics.timer("chart_render", histogram="chart_render_seconds"):
+                        images.append(render_figure(fig, self.fmt, width, height))
+        metrics.inc("charts_rendered_total", len(figures))
+        self.logger.info(f"Rendered {len(figures)} charts as {self.fmt} with {self.workers} worker(s)")
+        return images
+
+
+def plotly_histogram(labels, counts, title: str, xaxis_title: str, yaxis_title: str):
+    """The survey report's distribution histogram, from precomputed bin counts, as a plotly figure."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=labels,
+        y=counts,
+        marker_color='blue',
+        opacity=0.7
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=xaxis_title,
+        yaxis_title=yaxis_title,
+        bargap=.9,
+        width=2400,    # Increase the width of the figure
+        height=2400, font=dict(size=18)      # Increase the height of the figure
+    )
+    fig.update_xaxes(tickmode='linear', dtick=1, showticklabels=True)
+    return fig
+
+
+def plotly_hbar(labels, counts, bar_colors, title: str, xaxis_title: str, yaxis_title: str):
+    """The survey report's horizontal bar chart as a plotly figure, bar_colors as (r, g, b)."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=counts,
+        y=labels,
+        orientation="h",  # Horizontal bars
+        marker=dict(color=[f'rgb({r},{g},{b})' for r, g, b in bar_colors])  # Assign colors
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=xaxis_title,
+        yaxis_title=yaxis_title,
+        bargap=.55,
+        width=2400,    # Increase the width
+        height=2500,   # Increase the height
+        font=dict(size=20),
+        showlegend=False
+    )
+    fig.update_xaxes(tickmode='linear', dtick=1, showticklabels=True)
+    return fig
+
+
+def svg_flowable(svg: bytes, width: float, height: float):
+    """Scale an SVG chart into a ReportLab drawing of width x height points."""
+    try:
+        from svglib.svglib import svg2rlg
+    except ImportError as e:
+        raise ImportError("Vector charts need svglib, install it with `pip install svglib`") from e
+
+    drawing = svg2rlg(io.BytesIO(svg))
+    sx, sy = width / drawing.width, height / drawing.height
+    drawing.scale(sx, sy)
+    drawing.width, drawing.height = width, height
+    return drawing
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import random
+    import tempfile
+    from time import perf_counter
+
+    import pandas as pd
+
+    from src.fake_llm import COLLEGES, DEGREES, DEPARTMENTS, GENDERS, SKILLS, UNIVERSITIES
+    from src.pdf_build import create_survey_report
+
+    parser = argparse.ArgumentParser(description="Compare report build time and size across chart renderers")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--formats", nargs="+", default=["png", "svg"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--native", action="store_true", help="Also time the native ReportLab chart backend")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    rng = random.Random(0)
+    df = pd.DataFrame({
+        "university": [rng.choice(UNIVERSITIES) for _ in range(args.rows)],
+        "age": [rng.randint(21, 45) for _ in range(args.rows)],
+        "college": [rng.choice(COLLEGES) for _ in range(args.rows)],
+        "gender": [rng.choice(GENDERS) for _ in range(args.rows)],
+        "experience": [rng.randint(0, 15) for _ in range(args.rows)],
+        "department": [rng.choice(DEPARTMENTS) for _ in range(args.rows)],
+        "degrees": [rng.choice(DEGREES) for _ in range(args.rows)],
+        "skills": [str(rng.sample(SKILLS, rng.randint(3, 8))) for _ in range(args.rows)],
+    })
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in args.formats:
+            for workers in args.workers:
+                output = os.path.join(tmp, f"report_{fmt}_{workers}.pdf")
+                start = perf_counter()
+                create_survey_report(df, output, chart_format=fmt, render_workers=workers)
+                results.append({"backend": "plotly", "format": fmt, "workers": workers,
+                                "seconds": round(perf_counter() - start, 3), "bytes": os.path.getsize(output)})
+        if args.native:
+            output = os.path.join(tmp, "report_reportlab.pdf")
+            start = perf_counter()
+            create_survey_report(df, output, chart_backend="reportlab")
+            results.append({"backend": "reportlab", "format": "vector", "workers": 1,
+                            "seconds": round(perf_counter() - start, 3), "bytes": os.path.getsize(output)})
+    print(json.dumps(results, indent=2))
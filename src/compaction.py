@@ -0,0 +1,129 @@
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+PAGE_NUMBER = re.compile(r"^\s*(page\s*)?\d+\s*((of|/)\s*\d+)?\s*$", re.IGNORECASE)
+DIGITS = re.compile(r"\d+")
+SPACES = re.compile(r"[ \t ]+")
+BLANK_LINES = re.compile(r"\n{3,}")
+# Phone numbers start with + or have 9+ digits, so "2015 - 2019" or "2019-2023" are not taken for one
+PHONE = r"\+\d(?:[\s().-]{0,2}\d){6,}|(?<!\d)\d(?:[\s().-]?\d){8,}"
+CONTACT = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|https?://\S+|www\.\S+|" + PHONE)
+
+# Sections that never hold a CandidateInfo field
+TRIMMED_SECTIONS = ("references", "referees", "hobbies", "interests", "declaration", "personal statement")
+# Headings that end a trimmed section
+SECTION_HEADINGS = TRIMMED_SECTIONS + (
+    "education", "experience", "work history", "work experience", "employment", "skills", "technical skills",
+    "projects", "certifications", "courses", "languages", "summary", "profile", "publications", "awards",
+)
+EDGE_BLOCKS = 2  # blocks at each end of a page that may be a header or footer
+
+
+def page_blocks(page) -> List[str]:
+    """Text blocks of a PyMuPDF page in reading order."""
+    blocks = sorted(page.get_text("blocks"), key=lambda block: (block[1], block[0]))
+    return [block[4] for block in blocks if block[6] == 0 and block[4].strip()]
+
+
+def _shape(text: str) -> str:
+    """Block text with numbers masked, so "Page 1 of 3" and "Page 2 of 3" look alike."""
+    return DIGITS.sub("#", " ".join(text.split()).lower())
+
+
+def _heading(block: str) -> Optional[str]:
+    first = block.strip().split("\n", 1)[0].strip().rstrip(":").lower()
+    return first if first in SECTION_HEADINGS else None
+
+
+def compact_blocks(pages: Sequence[Sequence[str]], trim_sections: bool = False,
+                   max_chars: Optional[int] = None) -> str:
+    """Join a CV's page blocks into compact prompt text.
+
+    Blocks at the top or bottom of a page that repeat (numbers aside) on at
+    least half of the pages (two at least) are running headers/footers and are dropped, as
+    are bare page numbers. Whitespace is collapsed. With trim_sections,
+    sections such as References or Hobbies and contact lines (emails,
+    phones, links) are dropped too. max_chars caps the result.
+    """
+    edge_shapes = Counter()
+    for blocks in pages:
+        edges = set(blocks[:EDGE_BLOCKS]) | set(blocks[-EDGE_BLOCKS:])
+        edge_shapes.update({_shape(block) for block in edges})
+    repeated = {shape for shape, count in edge_shapes.items() if count >= 2 and count * 2 >= len(pages)}
+
+    kept = []
+    trimming = False
+    for blocks in pages:
+        for position, block in enumerate(blocks):
+            at_edge = position < EDGE_BLOCKS or position >= len(blocks) - EDGE_BLOCKS
+            if PAGE_NUMBER.match(block) or (at_edge and _shape(block) in repeated):
+                continue
+            if trim_sections:
+                heading = _heading(block)
+                if heading is not None:
+                    trimming = heading in TRIMMED_SECTIONS
+                if trimming:
+                    continue
+                block = "\n".join(line for line in block.split("\n") if not CONTACT.search(line))
+            lines = [SPACES.sub(" ", line).strip() for line in block.split("\n")]
+            block = "\n".join(line for line in lines if line)
+            if block:
+                kept.append(block)
+    text = BLANK_LINES.sub("\n\n", "\n\n".join(kept))
+    if max_chars is not None and len(text) > max_chars:
+        text = text[:max_chars]
+    return text
+
+
+def compact_pdf(doc, options: Dict[str, Any]) -> Tuple[str, int]:
+    """(compact text, raw text length) of an open PyMuPDF document, options as taken by compact_blocks."""
+    pages = [page_blocks(page) for page in doc]
+    raw_chars = sum(len(block) for blocks in pages for block in blocks)
+    return compact_blocks(pages, **options), raw_chars
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import logging
+    import os
+    import tempfile
+
+    from src.init_agent import ExtractAgent
+    from src.rate_limit import estimate_tokens
+    from src.synthetic_cvs import generate_corpus
+
+    parser = argparse.ArgumentParser(description="Check that compaction leaves fake-model extraction unchanged")
+    parser.add_argument("--golden", help="Folder of CVs to check (a synthetic one is generated if not set)")
+    parser.add_argument("--count", type=int, default=50, help="Synthetic CVs to generate")
+    parser.add_argument("--trim_sections", action="store_true")
+    parser.add_argument("--max_cv_tokens", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        golden = args.golden
+        if golden is None:
+            golden = os.path.join(tmp, "golden")
+            generate_corpus(golden, args.count, min_pages=1, max_pages=6, seed=18, date_ranges=True)
+
+        extracted = {}
+        tokens = {}
+        for name, options in (("raw", {}), ("compact", {"compact": True, "trim_sections": args.trim_sections,
+                                                        "max_cv_tokens": args.max_cv_tokens})):
+            agent = ExtractAgent(backend="fake", dead_letter_path=os.path.join(tmp, "dead_letter.jsonl"), **options)
+            texts = agent.get_pdfs_content(golden)
+            matched, _, _ = agent.match_candidates(agent.extract_batches(texts))
+            extracted[name] = [matched.get(i) for i in range(len(texts))]
+            tokens[name] = sum(estimate_tokens(text) for text in texts)
+
+    mismatches = [i for i, (raw, compact) in enumerate(zip(extracted["raw"], extracted["compact"])) if raw != compact]
+    print(json.dumps({
+        "cvs": len(extracted["raw"]),
+        "raw_tokens": tokens["raw"],
+        "compact_tokens": tokens["compact"],
+        "reduction": round(1 - tokens["compact"] / tokens["raw"], 3) if tokens["raw"] else 0.0,
+        "field_mismatches": len(mismatches),
+    }, indent=2))
+    raise SystemExit(1 if mismatches else 0)
@@ -0,0 +1,141 @@
+import hashlib
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.metrics import metrics
+
+TOKEN = re.compile(r"\w+")
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(text: str, size: int = 5) -> np.ndarray:
+    """32-bit hashes of the distinct word size-grams of a lowercased text."""
+    tokens = TOKEN.findall(text.lower())
+    if len(tokens) < size:
+        grams = {" ".join(tokens)} if tokens else set()
+    else:
+        grams = {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+    return np.fromiter((zlib.crc32(gram.encode()) for gram in grams), dtype=np.uint64, count=len(grams))
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) with bands * rows == num_perm whose S-curve midpoint (1/b)^(1/r) is closest to threshold."""
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of CV texts, bucketed by LSH bands.
+
+    Exact duplicates are caught by a hash of the normalized text, near
+    duplicates by sharing at least one LSH band with an earlier text and
+    having an estimated Jaccard similarity of at least threshold. Each text
+    is only compared with the texts in its buckets, so the cost grows with
+    the number of texts rather than the number of pairs.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        rng = np.random.default_rng(seed)
+        # a < 2**31 keeps a * hash + b inside uint64
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.exact: Dict[str, int] = {}
+        self.buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self.signatures: Dict[int, np.ndarray] = {}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        hashes = shingles(text, self.shingle_size)
+        if not len(hashes):
+            return None
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=1)
+
+    def add(self, key: int, text: str) -> int:
+        """Index a text and return the key of the earlier text it duplicates, or key itself."""
+        digest = hashlib.sha256(" ".join(TOKEN.findall(text.lower())).encode()).hexdigest()
+        if digest in self.exact:
+            return self.exact[digest]
+        self.exact[digest] = key
+        signature = self.signature(text)
+        if signature is None:
+            return key
+        bands = [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        best, best_score = key, self.threshold
+        seen = set()
+        for band, bucket in zip(bands, self.buckets):
+            for other in bucket.get(band, ()):
+                if other in seen:
+                    continue
+                seen.add(other)
+                score = float(np.mean(self.signatures[other] == signature))
+                if score >= best_score:
+                    best, best_score = other, score
+        if best != key:
+            self.exact[digest] = best
+            return best
+        self.signatures[key] = signature
+        for band, bucket in zip(bands, self.buckets):
+            bucket.setdefault(band, []).append(key)
+        return key
+
+
+@metrics.timed("dedup")
+def find_duplicates(texts: List[str], threshold: float = 0.8, num_perm: int = 128,
+                    shingle_size: int = 5) -> List[int]:
+    """Index of each text's representative: the first text of its duplicate group, itself if unique."""
+    index = NearDuplicateIndex(threshold, num_perm, shingle_size)
+    representatives = [index.add(i, text) for i, text in enumerate(texts)]
+    metrics.inc("dedup_duplicates_total", sum(1 for i, rep in enumerate(representatives) if rep != i))
+    return representatives
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import random
+    from time import perf_counter
+
+    from src.synthetic_cvs import synthetic_fields, synthetic_pages
+
+    parser = argparse.ArgumentParser(description="Time near-duplicate detection on synthetic CV texts")
+    parser.add_argument("--count", nargs="+", type=int, default=[1_000, 10_000])
+    parser.add_argument("--duplicate_rate", type=float, default=0.2, help="Fraction of texts that are edited copies")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for count in args.count:
+        texts, truth = [], []
+        for i in range(count):
+            if texts and rng.random() < args.duplicate_rate:
+                original = rng.randrange(len(texts))
+                # A re-submission: same CV with the odd word changed
+                words = texts[original].split(" ")
+                for _ in range(max(1, len(words) // 100)):
+                    words[rng.randrange(len(words))] = "edited"
+                texts.append(" ".join(words))
+                truth.append(truth[original])
+            else:
+                texts.append("\n".join(synthetic_pages(synthetic_fields(rng), rng.randint(1, 3), rng)))
+                truth.append(i)
+        start = perf_counter()
+        representatives = find_duplicates(texts, args.threshold)
+        elapsed = perf_counter() - start
+        # Copies whose exact shingle Jaccard with their original reaches the threshold
+        expected = 0
+        for i in range(count):
+            if truth[i] != i:
+                a, b = set(shingles(texts[i]).tolist()), set(shingles(texts[truth[i]]).tolist())
+                expected += len(a & b) / len(a | b) >= args.threshold
+        found = sum(1 for i, rep in enumerate(representatives) if rep != i)
+        correct = sum(1 for i, rep in enumerate(representatives) if rep != i and truth[rep] == truth[i])
+        print(json.dumps({"texts": count, "seconds": round(elapsed, 3), "copies": count - len(set(truth)),
+                          "copies_above_threshold": expected, "found": found, "correct": correct}))
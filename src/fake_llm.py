@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import random
+import re
+import typing
+from time import sleep
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel
+
+from src.batching import split_tagged_cvs
+from src.rate_limit import estimate_tokens
+
+UNIVERSITIES = ["Cairo University", "Ain Shams University", "Japan University", "Alexandria University"]
+COLLEGES = ["Computer Science", "Engineering", "Other"]
+DEPARTMENTS = ["Computer Science", "Information Systems", "Software Engineering", "AI Department", "Security"]
+GENDERS = ["Male", "Female"]
+DEGREES = ["Bachelor's", "Master's", "PhD"]
+SKILLS = ["Python", "SQL", "Java", "C++", "Docker", "Pandas", "PyTorch", "Linux", "Git", "React", "Excel", "Spark"]
+
+FIELD_LINE = re.compile(r"^\s*([A-Za-z]+)\s*:\s*(.+?)\s*$", re.MULTILINE)
+
+VOCABULARY = {
+    "university": UNIVERSITIES,
+    "college": COLLEGES,
+    "department": DEPARTMENTS,
+    "gender": GENDERS,
+    "degrees": DEGREES,
+    "skills": SKILLS,
+}
+
+
+def split_cvs(text: str) -> List[Tuple[Optional[str], str]]:
+    """Split a batched prompt back into (cv id, text) pairs.
+
+    Prompts without ID tags are split on the old triple-newline separator.
+    """
+    tagged = split_tagged_cvs(text)
+    if tagged:
+        return tagged
+    chunks = [chunk.strip() for chunk in text.split("\n\n\n") if chunk.strip()] or [text]
+    return [(None, chunk) for chunk in chunks]
+
+
+class FakeModelError(Exception):
+    """Error raised by FakeChatModel, with an HTTP-like status code."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def stated_fields(cv: str) -> Dict[str, str]:
+    """`Label: value` lines of a CV, keyed by lowercased label."""
+    return {label.strip().lower(): value.strip() for label, value in FIELD_LINE.findall(cv)}
+
+
+class FakeChatModel:
+    """Deterministic local stand-in for ChatGoogleGenerativeAI.
+
+    Only supports `with_structured_output`, which is all ExtractAgent uses.
+    Every CV in the prompt yields one candidate. Fields the CV states as
+    `Label: value` lines (as synthetic CVs do) are read back, the others are
+    derived from a hash of the CV text, so identical input always gives
+    identical output.
+
+    latency (+ latency_per_1k_tokens of prompt) is slept per call, error_rate
+    makes calls fail with error_status from a seeded generator, and
+    skills_per_candidate fixes the output size. Prompts containing any of the
+    `fail_on` strings raise FakeModelError with `fail_status`.
+    """
+
+    def __init__(self, latency: float = 0.0, latency_per_1k_tokens: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, seed: int = 0,
+                 skills_per_candidate: Optional[int] = None,
+                 fail_on: Iterable[str] = (), fail_status: int = 400):
+        self.latency = latency
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.skills_per_candidate = skills_per_candidate
+        self.fail_on = list(fail_on)
+        self.fail_status = fail_status
+        self.calls = 0
+
+    def _delay(self, text: str) -> float:
+        return self.latency + self.latency_per_1k_tokens * estimate_tokens(text) / 1000
+
+    def _fake_value(self, name: str, annotation: Any, seed: int, stated: Dict[str, str]) -> Any:
+        value = stated.get(name)
+        if annotation is int:
+            if value is not None and value.isdigit():
+                return int(value)
+            return 20 + seed % 25 if name == "age" else seed % 15
+        if typing.get_origin(annotation) is list:
+            if value:
+                items = [item.strip() for item in value.split(",") if item.strip()]
+            else:
+                vocab = VOCABULARY.get(name, SKILLS)
+                items = [vocab[(seed >> shift) % len(vocab)] for shift in range(0, 3 + seed % 5)]
+            if self.skills_per_candidate is not None:
+                items = [items[i % len(items)] if items else f"Skill {i}" for i in range(self.skills_per_candidate)]
+            return items
+        if value:
+            return value
+        vocab = VOCABULARY.get(name, ["Unknown"])
+        return vocab[seed % len(vocab)]
+
+    def _respond(self, schema: Type[BaseModel], text: str) -> BaseModel:
+        self.calls += 1
+        for marker in self.fail_on:
+            if marker in text:
+                raise FakeModelError(f"fake failure on {marker!r}", self.fail_status)
+        if self.error_rate and self.random.random() < self.error_rate:
+            raise FakeModelError(f"fake error {self.error_status}", self.error_status)
+        candidate_model = typing.get_args(schema.model_fields["candidates"].annotation)[0]
+        candidates = []
+        for cv_id, cv in split_cvs(text):
+            seed = int(hashlib.sha256(cv.encode()).hexdigest()[:12], 16)
+            stated = stated_fields(cv)
+            fields = {
+                name: self._fake_value(name, field.annotation, seed, stated)
+                for name, field in candidate_model.model_fields.items()
+            }
+            if "cv_id" in fields:
+                fields["cv_id"] = cv_id or "unknown"
+            candidates.append(candidate_model(**fields))
+        return schema(candidates=candidates)
+
+    def with_structured_output(self, schema: Type[BaseModel]) -> RunnableLambda:
+        def invoke(prompt_value):
+            text = prompt_value.to_messages()[-1].content
+            sleep(self._delay(text))
+            return self._respond(schema, text)
+
+        async def ainvoke(prompt_value):
+            text = prompt_value.to_messages()[-1].content
+            await asyncio.sleep(self._delay(text))
+            return self._respond(schema, text)
+
+        return RunnableLambda(invoke, afunc=ainvoke)
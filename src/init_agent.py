@@ -1,14 +1,31 @@
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from time import sleep
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import asyncio
+import itertools
 import os
-import pandas as pd
 import glob
+import hashlib
+import json
 import fitz  # PyMuPDF
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from src.async_engine import AsyncExtractionEngine
+from src.backends import get_llm
+from src.metrics import metrics
+from src.retry import CircuitBreaker, write_dead_letter
+from src.journal import CACHED_RECORD_SIZE, ExtractionJournal, MemoryResults
+from src.pipeline import StreamingPipeline
+from src.cache import ExtractionCache, file_hash, prompt_fingerprint
+from src.compaction import compact_pdf
+from src.dedup import find_duplicates
+from src.candidate_store import export_csv, load_candidates, row_writer
+from src.summary import CandidateSummary
+from src.rate_limit import RateLimiter, estimate_tokens
+from src.batching import plan_batches, tag_cv, match_by_id, compare_with_fixed
 class CandidateInfo(BaseModel):
     university: str  
     age: int
@@ -23,24 +40,107 @@ class ExtractedData(BaseModel):
     candidates: list[CandidateInfo]
 
 
+class TaggedCandidateInfo(CandidateInfo):
+    cv_id: str
+
+
+class TaggedExtractedData(BaseModel):
+    candidates: list[TaggedCandidateInfo]
+
+
+def read_pdf_text(file_path: str, compaction: Optional[Dict[str, Any]] = None
+                  ) -> Tuple[str, str, Optional[str], int, int]:
+    """Read a PDF file and return (file_path, text, error, pages, raw_chars).
+
+    With compaction (options of compact_blocks) the text is compacted and
+    raw_chars is the length it had before. Module level so it can be
+    shipped to worker processes.
+    """
+    try:
+        doc = fitz.open(file_path)
+        if compaction is not None:
+            text, raw_chars = compact_pdf(doc, compaction)
+        else:
+            text = "\n".join([page.get_text() for page in doc])
+            raw_chars = len(text)
+        pages = doc.page_count
+        doc.close()
+        return file_path, text, None, pages, raw_chars
+    except Exception as e:
+        return file_path, f"Error processing document: {file_path}", str(e), 0, 0
+
+
 class ExtractAgent:    
-    def __init__(self):
+    def __init__(self, parallel_read: bool = False, read_workers: Optional[int] = None,
+                 read_chunksize: int = 8, llm=None, backend: str = "gemini",
+                 backend_options: Optional[Dict[str, Any]] = None, concurrency: int = 1,
+                 requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None,
+                 cache_path: Optional[str] = None, cache_max_entries: int = 100_000,
+                 token_budget: int = 8000, max_batch_cvs: Optional[int] = 10,
+                 max_retries: int = 3, backoff_base: float = 1.0,
+                 breaker_threshold: int = 5, breaker_cooldown: float = 30.0,
+                 dead_letter_path: str = "./dead_letter.jsonl", journal_path: Optional[str] = None,
+                 data_path: str = "./CVs_data.arrow", dedup_threshold: Optional[float] = None,
+                 dedup_mode: str = "reuse", compact: bool = False, trim_sections: bool = False,
+                 max_cv_tokens: Optional[int] = None, summary_path: Optional[str] = None):
         # Set up logging
         logging.basicConfig(level=logging.INFO, 
                             format='%(asctime)s - %(levelname)s - %(message)s')
         self.logger = logging.getLogger(__name__)
+
+        # PDF reading options
+        self.parallel_read = parallel_read
+        self.read_workers = read_workers
+        self.read_chunksize = read_chunksize
+        self.pdf_files: List[str] = []
+        self.read_errors: Dict[str, str] = {}
+
+        # LLM dispatch options, every batch goes through the async engine
+        self.token_budget = token_budget
+        self.max_batch_cvs = max_batch_cvs
+        self.concurrency = concurrency
+        self.rate_limiter = None
+        if requests_per_minute or tokens_per_minute:
+            self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+        # Failure handling: retries with jittered backoff, batch bisection,
+        # a circuit breaker on sustained 429/5xx and a dead-letter file
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.dead_letter_path = dead_letter_path
+        self.failures: Dict[int, str] = {}
+
+        # Append-only journal of completed batches, needed for resume
+        self.journal_path = journal_path
+
+        # Extracted candidates handed to the report stage, Arrow unless the path ends in .csv
+        self.data_path = data_path
+        # Mergeable statistics of the same rows, enough to draw the report without them
+        self.summary_path = summary_path
+
+        # Near-duplicate CVs: only the first of a group goes to the model, the
+        # others reuse its candidate ("reuse") or are left out ("collapse")
+        if dedup_mode not in ("reuse", "collapse"):
+            raise ValueError(f"Unknown dedup mode {dedup_mode!r}, expected 'reuse' or 'collapse'")
+        self.dedup_threshold = dedup_threshold
+        self.dedup_mode = dedup_mode
+
+        # Prompt compaction: running headers/footers, page numbers and extra
+        # whitespace are dropped, optionally irrelevant sections too, and each
+        # CV is capped at max_cv_tokens (estimated)
+        self.compaction = None
+        if compact or trim_sections or max_cv_tokens:
+            self.compaction = {"trim_sections": trim_sections,
+                               "max_chars": max_cv_tokens * 4 if max_cv_tokens else None}
+        self.raw_chars = 0
+        self.sent_chars = 0
         
         # Set up LLM and parsing components
         self.parser = PydanticOutputParser(pydantic_object=ExtractedData)
-        self.llm = ChatGoogleGenerativeAI(
-            model=os.environ["MODEL"],
-            temperature=0.2,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
-            api_key=os.environ["GEMINI_API_KEY"]
-        )
-        self.llm_with_structured_output = self.llm.with_structured_output(ExtractedData)
+        # An explicit llm wins, otherwise build the selected backend
+        self.llm = llm if llm is not None else get_llm(backend, **(backend_options or {}))
+        self.llm_with_structured_output = self.llm.with_structured_output(TaggedExtractedData)
         self.prompt = ChatPromptTemplate.from_messages([
             (
                 "system",
@@ -53,6 +153,7 @@ class ExtractAgent:
                 - Gender: Extract stated gender (Female or Male).
                 - Skills: Extract a comprehensive list of technical skills section mentioned in the CV.
                 -Degrees Obtained: degree of candidate classify as (e.g., Bachelor's, Master's, PhD).
+                Each CV is wrapped in <cv id="..."></cv> tags. Return exactly one candidate per CV and copy the CV's id into cv_id.
                 Present all information in a structured format with proper capitalization for each field. Ensure responses are accurate, consistent, and follow standard naming conventions.
                 """,
             ),
@@ -60,31 +161,102 @@ class ExtractAgent:
         ])
         self.chain = self.prompt | self.llm_with_structured_output
 
+        # Per-CV result cache, keyed by PDF hash, model and prompt/schema fingerprint
+        self.model_name = getattr(self.llm, "model", None) or type(self.llm).__name__
+        self.fingerprint = prompt_fingerprint(self.prompt, TaggedExtractedData)
+        if self.compaction is not None:
+            # Compacted CVs may extract differently, keep their cache entries apart
+            options = json.dumps(self.compaction, sort_keys=True)
+            self.fingerprint = hashlib.sha256(f"{self.fingerprint}{options}".encode()).hexdigest()[:16]
+        self.prompt_overhead = estimate_tokens(self.prompt.messages[0].prompt.template)
+        self.cache = ExtractionCache(cache_path, cache_max_entries) if cache_path else None
+
     def read_pdf(self, file_path: str) -> str:
         """Read a PDF file and extract its text content."""
-        try:
-            doc = fitz.open(file_path)
-            text = "\n".join([page.get_text() for page in doc])
-            doc.close()  # Properly close the document
-            return text
-        except Exception as e:
-            self.logger.error(f"Error reading {file_path}: {e}")
-            return f"Error processing document: {file_path}"
+        _, text, error, pages, raw_chars = read_pdf_text(file_path, self.compaction)
+        metrics.inc("pages_parsed_total", pages)
+        self.count_chars(raw_chars, text, error)
+        if error:
+            self.logger.error(f"Error reading {file_path}: {error}")
+            self.read_errors[file_path] = error
+        return text
 
-    def get_pdfs_content(self, path: str) -> List[str]:
-        """Get content from all PDF files in the specified directory."""
-        self.logger.info(f"path of reading files is {path}")
+    def read_pdfs_parallel(self, pdf_files: List[str]) -> List[str]:
+        """Read PDF files in a process pool, keeping the order of pdf_files."""
+        workers = self.read_workers or os.cpu_count() or 1
+        self.logger.info(f"Reading {len(pdf_files)} PDFs with {workers} workers (chunksize={self.read_chunksize})")
 
-        pdf_files = glob.glob(f"{path}/*.pdf")
-        self.logger.info(f"Found {len(pdf_files)} PDF files in {path}")
-        
         pdf_list = []
-        for file in pdf_files:
-            self.logger.info(f"Reading {file}")
-            pdf_list.append(self.read_pdf(file))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map keeps input order, so texts line up with pdf_files
+            read = partial(read_pdf_text, compaction=self.compaction)
+            for file, text, error, pages, raw_chars in executor.map(read, pdf_files, chunksize=self.read_chunksize):
+                metrics.inc("pages_parsed_total", pages)
+                self.count_chars(raw_chars, text, error)
+                if error:
+                    self.logger.error(f"Error reading {file}: {error}")
+                    self.read_errors[file] = error
+                pdf_list.append(text)
+        return pdf_list
+
+    def count_chars(self, raw_chars: int, text: str, error: Optional[str]):
+        """Tally the characters read and the characters left to send after compaction."""
+        if error:
+            return
+        self.raw_chars += raw_chars
+        self.sent_chars += len(text)
+        metrics.inc("cv_chars_raw_total", raw_chars)
+        metrics.inc("cv_chars_sent_total", len(text))
+
+    def log_compaction(self):
+        if self.compaction is None or not self.raw_chars:
+            return
+        raw_tokens, sent_tokens = self.raw_chars // 4, self.sent_chars // 4
+        self.logger.info(f"Compaction: ~{raw_tokens} -> ~{sent_tokens} estimated CV tokens "
+                         f"(-{1 - self.sent_chars / self.raw_chars:.1%})")
+
+    def read_pdf_files(self, pdf_files: List[str]) -> List[str]:
+        """Read the given PDF files, serially or in a process pool, keeping their order."""
+        start = perf_counter()
+        self.raw_chars = self.sent_chars = 0
+        with metrics.timer("pdf_parsing"):
+            if self.parallel_read and len(pdf_files) > 1:
+                pdf_list = self.read_pdfs_parallel(pdf_files)
+            else:
+                pdf_list = []
+                for file in pdf_files:
+                    self.logger.info(f"Reading {file}")
+                    pdf_list.append(self.read_pdf(file))
+        elapsed = perf_counter() - start
+        metrics.inc("pdf_files_read_total", len(pdf_files))
+        metrics.inc("pdf_read_errors_total", sum(1 for file in pdf_files if file in self.read_errors))
+
+        mode = "parallel" if self.parallel_read else "serial"
+        rate = len(pdf_files) / elapsed if elapsed > 0 else 0.0
+        self.logger.info(f"Read {len(pdf_files)} PDFs ({mode}) in {elapsed:.2f}s - {rate:.1f} files/sec")
+        if self.read_errors:
+            self.logger.warning(f"{len(self.read_errors)} PDF files could not be read")
+        self.log_compaction()
         
         return pdf_list
 
+    def find_pdfs(self, path: str) -> List[str]:
+        """List the PDF files of a directory in sorted order."""
+        self.logger.info(f"path of reading files is {path}")
+
+        pdf_files = sorted(glob.glob(f"{path}/*.pdf"))
+        self.logger.info(f"Found {len(pdf_files)} PDF files in {path}")
+        self.pdf_files = pdf_files
+        self.read_errors = {}
+        return pdf_files
+
+    def get_pdfs_content(self, path: str) -> List[str]:
+        """Get content from all PDF files in the specified directory.
+
+        Texts are returned in the order of self.pdf_files (sorted paths).
+        """
+        return self.read_pdf_files(self.find_pdfs(path))
+
     def get_data_as_dict(self, extracted_data_list: List[Dict[str, Any]]) -> Dict[str, List]:
         """Flattens the extracted candidate information into a dictionary."""
         candidate_keys = CandidateInfo.model_fields
@@ -121,60 +293,262 @@ class ExtractAgent:
 
         return structured_data
 
-    def generate_data(self, pdf_list: List[str]) -> pd.DataFrame:
+    def make_batches(self, pdf_list: List[str]) -> List[List[int]]:
+        """Pack CV indices into batches that fit self.token_budget."""
+        token_counts = [estimate_tokens(tag_cv(i, text)) for i, text in enumerate(pdf_list)]
+        batches = plan_batches(token_counts, self.token_budget, self.max_batch_cvs)
+        report = compare_with_fixed(token_counts, self.token_budget, self.max_batch_cvs,
+                                    prompt_overhead=self.prompt_overhead)
+        self.logger.info(f"Planned {len(batches)} requests for {len(pdf_list)} CVs "
+                         f"({report['requests_saved']} requests and ~{report['tokens_saved']} tokens "
+                         f"fewer than batches of 3)")
+        return batches
+
+    def batch_prompt(self, pdf_list: List[str], indices: List[int]) -> str:
+        """Join the ID-tagged CVs of one batch into the text sent to the model."""
+        return "\n\n".join(tag_cv(i, pdf_list[i]) for i in indices)
+
+    def save_data(self, extracted_data_list: List[Dict[str, Any]]) -> int:
+        """Flatten the batch responses, write them to self.data_path and return the number of rows."""
+        candidates = [candidate for batch in extracted_data_list for candidate in batch.get("candidates", [])]
+        return self.save_rows(iter(candidates))
+
+    def save_rows(self, rows: Iterator[Dict[str, Any]], chunk_size: int = 1000) -> int:
+        """Append candidates to self.data_path chunk by chunk, one record batch (or CSV block) per chunk.
+
+        Only one chunk is held at a time; returns the number of rows written,
+        load_candidates(self.data_path) reads them back.
+        """
+        written = 0
+        chunk = []
+        summary = CandidateSummary() if self.summary_path else None
+        writer = row_writer(self.data_path, self.get_data_as_dict, summary)
+        for candidate in itertools.chain(rows, [None]):
+            if candidate is not None:
+                chunk.append(candidate)
+            if chunk and (len(chunk) == chunk_size or candidate is None):
+                writer.write(chunk)
+                written += len(chunk)
+                chunk = []
+        writer.close()
+        if summary is not None:
+            summary.save(self.summary_path)
+            self.logger.info(f"Summary of {summary.rows} candidates written to {self.summary_path}")
+        return written
+
+    async def ainvoke_batches(self, pdf_list: List[str], batches: List[List[int]],
+                              on_result=None) -> List[Tuple[List[int], Dict[str, Any]]]:
+        """Send the batches with self.concurrency requests in flight.
+
+        CVs that could not be extracted end up in self.failures. With
+        on_result, each result is passed to it as soon as it arrives
+        instead of being returned.
+        """
+        engine = AsyncExtractionEngine(self.chain, lambda indices: self.batch_prompt(pdf_list, indices),
+                                       concurrency=self.concurrency, rate_limiter=self.rate_limiter,
+                                       max_retries=self.max_retries, backoff_base=self.backoff_base,
+                                       breaker=self.breaker, logger=self.logger, on_result=on_result)
+        results = await engine.run(batches)
+        self.failures = engine.failures
+        return results
+
+    def extract_batches(self, pdf_list: List[str], on_result=None) -> List[Tuple[List[int], Dict[str, Any]]]:
+        """Batch the CVs and return (cv indices, response) for every successful request."""
+        batches = self.make_batches(pdf_list)
+        self.logger.info(f"Processing {len(pdf_list)} CVs in {len(batches)} batches "
+                         f"(concurrency {self.concurrency})")
+        with metrics.timer("llm_dispatch"):
+            return asyncio.run(self.ainvoke_batches(pdf_list, batches, on_result))
+
+    def match_candidates(self, batch_results: List[Tuple[List[int], Dict[str, Any]]]
+                         ) -> Tuple[Dict[int, Dict[str, Any]], List[Dict[str, Any]], List[int]]:
+        """Map returned candidates back to CV indices through their cv_id.
+
+        Returns (matched, unattributed candidates, CV indices without a candidate).
+        Candidates whose ID is unknown or repeated are returned unattributed.
+        """
+        matched = {}
+        unmatched = []
+        missing = []
+        for indices, response in batch_results:
+            metrics.inc("candidates_returned_total", len(response.get("candidates", [])))
+            batch_matched, batch_unmatched, batch_missing = match_by_id(indices, response.get("candidates", []))
+            if batch_unmatched or batch_missing:
+                self.logger.warning(f"Batch of {len(indices)} CVs: {len(batch_missing)} CVs without a candidate, "
+                                    f"{len(batch_unmatched)} candidates with an unknown or repeated cv_id")
+            matched.update(batch_matched)
+            unmatched.extend(batch_unmatched)
+            missing.extend(batch_missing)
+        return matched, unmatched, missing
+
+    def dead_letter_entries(self, labels: List[str], missing: List[int]) -> List[Dict[str, str]]:
+        """One entry per CV (labelled by labels[index]) that produced no candidate."""
+        entries = [{"cv": labels[i], "reason": reason} for i, reason in sorted(self.failures.items())]
+        entries += [{"cv": labels[i], "reason": "model returned no candidate for this CV"} for i in missing]
+        return entries
+
+    def save_dead_letter(self, entries: List[Dict[str, str]]):
+        if not entries:
+            return
+        write_dead_letter(self.dead_letter_path, entries)
+        self.logger.warning(f"{len(entries)} CVs could not be extracted, see {self.dead_letter_path}")
+
+    def save_matched(self, pdf_list: List[str], batch_results: List[Tuple[List[int], Dict[str, Any]]]) -> int:
+        """Save candidates in CV order, followed by any unattributed ones."""
+        matched, unmatched, missing = self.match_candidates(batch_results)
+        self.save_dead_letter(self.dead_letter_entries([f"cv-{i}" for i in range(len(pdf_list))], missing))
+        return self.save_data([{"candidates": [matched[i] for i in sorted(matched)] + unmatched}])
+
+    def generate_data(self, pdf_list: List[str]) -> int:
         """Processes CVs in batches and extracts structured information."""
-        extracted_data_list = []
-        batch_size = 3
-        total_batches = (len(pdf_list) + batch_size - 1) // batch_size
-        
-        self.logger.info(f"Processing {len(pdf_list)} CVs in {total_batches} batches")
-        
-        for batch_idx, i in enumerate(range(0, len(pdf_list), batch_size)):
-            cv_chunk = pdf_list[i:i + batch_size]
-            self.logger.info(f"Processing batch {batch_idx + 1}/{total_batches} ({len(cv_chunk)} CVs)")
-            
-            max_retries = 3
-            retry_count = 0
-            
-            while retry_count < max_retries:
-                try:
-                    response = self.chain.invoke({"cv": "\n\n\n".join(cv_chunk)}).dict()
-                    extracted_data_list.append(response)
-                    self.logger.info(f"Successfully processed batch {batch_idx + 1}")
-                    break
-                except Exception as e:
-                    retry_count += 1
-                    self.logger.error(f"Error in batch {batch_idx + 1} (attempt {retry_count}/{max_retries}): {e}")
-                    if retry_count < max_retries:
-                        sleep_time = 10 * retry_count  # Exponential backoff
-                        self.logger.info(f"Retrying in {sleep_time} seconds...")
-                        sleep(sleep_time)
-                    else:
-                        self.logger.error(f"Failed to process batch {batch_idx + 1} after {max_retries} attempts")
-        
-        data = self.get_data_as_dict(extracted_data_list)
-        data_dataframe=pd.DataFrame(data)
-        data_dataframe.to_csv("./CVs_data.csv",index=False)
-        return data_dataframe
+        return self.save_matched(pdf_list, self.extract_batches(pdf_list))
+
+    async def agenerate_data(self, pdf_list: List[str]) -> int:
+        """Like generate_data, for callers already running an event loop."""
+        batches = self.make_batches(pdf_list)
+        self.logger.info(f"Processing {len(pdf_list)} CVs in {len(batches)} batches "
+                         f"(concurrency {self.concurrency})")
+        return self.save_matched(pdf_list, await self.ainvoke_batches(pdf_list, batches))
 
-    def run(self, path: str, output_path: Optional[str] = None) -> pd.DataFrame:
-        """Main method to run the extraction process."""
+    def lookup_cache(self, pdf_files: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+        """Return the cached candidates and the content hash of every file."""
+        if self.cache is None:
+            return {}, {}
+        hashes = {file: file_hash(file) for file in pdf_files}
+        cached = {}
+        for file in pdf_files:
+            candidate = self.cache.get(hashes[file], self.model_name, self.fingerprint)
+            if candidate is not None:
+                cached[file] = candidate
+        self.cache.touch()
+        stats = self.cache.stats()
+        self.logger.info(f"Cache: {len(cached)} of {len(pdf_files)} CVs cached "
+                         f"(hits={stats['hits']}, misses={stats['misses']}, entries={stats['entries']})")
+        return cached, hashes
+
+    def deduplicate(self, texts: List[str], files: List[str]) -> Tuple[List[str], List[str], Dict[str, List[str]]]:
+        """Drop near-duplicate CVs before dispatch when self.dedup_threshold is set.
+
+        Returns the texts and files still to send and, for each file sent,
+        the files found to duplicate it.
+        """
+        if not self.dedup_threshold or len(texts) < 2:
+            return texts, files, {}
+        representatives = find_duplicates(texts, self.dedup_threshold)
+        duplicates: Dict[str, List[str]] = {}
+        for i, rep in enumerate(representatives):
+            if rep != i:
+                duplicates.setdefault(files[rep], []).append(files[i])
+        keep = [i for i, rep in enumerate(representatives) if rep == i]
+        kept_texts = [texts[i] for i in keep]
+        if duplicates:
+            token_counts = [estimate_tokens(tag_cv(i, text)) for i, text in enumerate(texts)]
+            kept_counts = [token_counts[i] for i in keep]
+            calls_avoided = (len(plan_batches(token_counts, self.token_budget, self.max_batch_cvs))
+                             - len(plan_batches(kept_counts, self.token_budget, self.max_batch_cvs)))
+            metrics.inc("dedup_llm_calls_avoided_total", calls_avoided)
+            self.logger.info(f"Dedup: {len(texts) - len(keep)} of {len(texts)} CVs are near duplicates "
+                             f"({self.dedup_mode}), {calls_avoided} LLM calls and "
+                             f"~{sum(token_counts) - sum(kept_counts)} tokens avoided")
+        return kept_texts, [files[i] for i in keep], duplicates
+
+    def run(self, path: str, output_path: Optional[str] = None, resume: bool = False) -> int:
+        """Main method to run the extraction process, returns the number of candidates written.
+
+        With a journal_path, every finished batch is journaled right away and
+        resume=True replays the journal and only sends the remaining CVs.
+        """
         self.logger.info(f"Starting CV extraction from {path}")
-        
-        # Get PDF contents
-        pdfs_list = self.get_pdfs_content(path)
-        
-        if not pdfs_list or len(pdfs_list) == 0:
+        return self.run_files(self.find_pdfs(path), output_path, resume)
+
+    def run_files(self, pdf_files: List[str], output_path: Optional[str] = None,
+                  resume: bool = False) -> int:
+        """Like run, for an explicit list of PDF files (e.g. one shard of a work queue)."""
+        self.pdf_files = pdf_files
+        self.read_errors = {}
+        if not pdf_files:
             self.logger.warning("No PDF content was found or extracted")
-            return pd.DataFrame()
+            return 0
+
+        results = MemoryResults()
+        done = set()
+        if self.journal_path:
+            results = ExtractionJournal(self.journal_path, self.fingerprint, self.model_name)
+            done = results.start(resume)
+        remaining = [file for file in pdf_files if file not in done]
+
+        # Cached CVs skip the LLM call, and reading too unless dedup needs their text
+        cached, hashes = self.lookup_cache(remaining)
+        to_read = remaining if self.dedup_threshold else [file for file in remaining if file not in cached]
+        
+        # Get PDF contents, unreadable files go straight to the dead-letter file
+        pdfs_list = self.read_pdf_files(to_read)
+        for file in cached:
+            # A cached CV that cannot be read again still has its candidate
+            self.read_errors.pop(file, None)
+        readable = [i for i, file in enumerate(to_read) if file not in self.read_errors]
+        texts, files, duplicates = self.deduplicate([pdfs_list[i] for i in readable], [to_read[i] for i in readable])
+        del pdfs_list
+        # Duplicates are decided over cached and new CVs alike, so the output does not depend on the cache
+        from_cache = {file: cached[file] for file in (files if self.dedup_threshold else cached) if file in cached}
+        if self.dedup_mode == "reuse":
+            from_cache.update({copy: from_cache[file] for file in list(from_cache)
+                               for copy in duplicates.get(file, [])})
+        # Journal records stay small, rows() reads a whole record back per lookup
+        cached_files = list(from_cache)
+        for start in range(0, len(cached_files), CACHED_RECORD_SIZE):
+            chunk = cached_files[start:start + CACHED_RECORD_SIZE]
+            results.add(chunk, {file: from_cache[file] for file in chunk}, [], [])
+        send = [i for i, file in enumerate(files) if file not in cached]
+        pending_texts = [texts[i] for i in send]
+        pending_files = [files[i] for i in send]
+        del texts
+
+        def on_result(indices: List[int], response: Dict[str, Any]):
+            matched, unmatched, missing = self.match_candidates([(indices, response)])
+            candidates = {pending_files[i]: candidate for i, candidate in matched.items()}
+            copies = [copy for i in indices for copy in duplicates.get(pending_files[i], [])]
+            if self.dedup_mode == "reuse":
+                candidates.update({copy: candidates[file] for file in candidates
+                                   for copy in duplicates.get(file, [])})
+            if self.cache is not None:
+                for file, candidate in candidates.items():
+                    self.cache.put(hashes[file], self.model_name, self.fingerprint, candidate)
+            missing_files = [pending_files[i] for i in missing]
+            missing_files += [copy for i in missing for copy in duplicates.get(pending_files[i], [])]
+            results.add([pending_files[i] for i in indices] + copies, candidates, unmatched, missing_files)
         
         # Generate structured data
-        self.logger.info(f"Generating structured data from {len(pdfs_list)} CVs")
-        df = self.generate_data(pdfs_list)
+        self.logger.info(f"Generating structured data from {len(pending_texts)} CVs")
+        self.failures = {}
+        if pending_texts:
+            self.extract_batches(pending_texts, on_result)
+
+        dead_letter = [{"cv": file, "reason": f"could not read PDF: {error}"}
+                       for file, error in self.read_errors.items()]
+        dead_letter += [{"cv": pending_files[i], "reason": reason} for i, reason in sorted(self.failures.items())]
+        dead_letter += [{"cv": copy, "reason": f"near duplicate of {pending_files[i]}, which failed: {reason}"}
+                        for i, reason in sorted(self.failures.items()) for copy in duplicates.get(pending_files[i], [])]
+        dead_letter += [{"cv": file, "reason": "model returned no candidate for this CV"} for file in results.missing]
+        self.save_dead_letter(dead_letter)
+
+        with metrics.timer("write_output"):
+            written = self.save_rows(results.rows(pdf_files))
+        if self.journal_path:
+            results.close()
         
         # Save to CSV if output path is provided
-        if output_path and not df.empty:
+        if output_path and written:
             self.logger.info(f"Saving extracted data to {output_path}")
-            df.to_csv(output_path, index=False)
+            export_csv(load_candidates(self.data_path), output_path)
         
-        return df
+        return written
+
+    def run_streaming(self, path: str, output_path: Optional[str] = None, queue_size: int = 64) -> Dict[str, Any]:
+        """Extract a directory through the streaming pipeline and return its stats.
+
+        Reading, batching, LLM calls and writing overlap, memory stays
+        bounded by queue_size, and rows reach output_path in completion order.
+        """
+        self.logger.info(f"Starting streaming CV extraction from {path}")
+        return StreamingPipeline(self, output_path or self.data_path, queue_size).run(path)
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+
+CACHED_RECORD_SIZE = 256  # cache hits per journal record
+PARSED_RECORDS = 16  # journal records kept parsed while writing the output
+
+
+class MemoryResults:
+    """Keeps extracted candidates in memory, for runs without a journal."""
+
+    def __init__(self):
+        self.candidates: Dict[str, Dict[str, Any]] = {}
+        self.unmatched: List[Tuple[str, Dict[str, Any]]] = []
+        self.missing: List[str] = []
+
+    def add(self, files: List[str], candidates: Dict[str, Dict[str, Any]],
+            unmatched: List[Dict[str, Any]], missing: List[str]):
+        self.candidates.update(candidates)
+        self.unmatched.extend((files[0], candidate) for candidate in unmatched)
+        self.missing.extend(missing)
+
+    def rows(self, pdf_files: List[str]) -> Iterator[Dict[str, Any]]:
+        """Candidates in file order, then unattributed ones by the position of their batch."""
+        for file in pdf_files:
+            if file in self.candidates:
+                yield self.candidates[file]
+        position = {file: i for i, file in enumerate(pdf_files)}
+        for _, candidate in sorted(self.unmatched, key=lambda item: position.get(item[0], len(position))):
+            yield candidate
+
+
+class ExtractionJournal:
+    """Append-only JSON lines record of every completed batch.
+
+    Each line is written and fsynced as soon as its batch finishes, so a
+    crash or Ctrl-C loses at most the batches still in flight. Only byte
+    offsets are kept in memory; candidates are read back from disk when
+    the final output is written.
+    """
+
+    def __init__(self, path: str, fingerprint: str, model: str):
+        self.path = path
+        self.header = {"type": "header", "fingerprint": fingerprint, "model": model}
+        self.logger = logging.getLogger(__name__)
+        self.offsets: Dict[str, int] = {}
+        self.unmatched_offsets: List[Tuple[str, int]] = []
+        self.missing: List[str] = []
+        self.completed: Set[str] = set()
+        self.file = None
+
+    def start(self, resume: bool = False) -> Set[str]:
+        """Open the journal and return the files already completed.
+
+        Without resume, any previous journal is discarded.
+        """
+        if resume and os.path.exists(self.path):
+            self._replay()
+            self.file = open(self.path, "ab")
+            self.logger.info(f"Resuming from {self.path}: {len(self.completed)} CVs already extracted")
+        else:
+            self.file = open(self.path, "wb")
+            self._write(self.header)
+        return set(self.completed)
+
+    def _replay(self):
+        valid_end = 0
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Last line cut short by a crash, it is overwritten below
+                    self.logger.warning(f"Ignoring truncated journal line at byte {offset}")
+                    break
+                if record.get("type") == "header":
+                    if record["fingerprint"] != self.header["fingerprint"] or record["model"] != self.header["model"]:
+                        raise ValueError(f"{self.path} was written with another prompt, schema or model; "
+                                         f"remove it or run without --resume")
+                else:
+                    self._index(record, offset)
+                offset += len(line)
+                valid_end = offset
+        with open(self.path, "r+b") as f:
+            f.truncate(valid_end)
+
+    def _index(self, record: Dict[str, Any], offset: int):
+        for file in record["candidates"]:
+            self.offsets[file] = offset
+        if record["unmatched"]:
+            self.unmatched_offsets.append((record["files"][0], offset))
+        self.missing.extend(record["missing"])
+        self.completed.update(record["files"])
+
+    def _write(self, record: Dict[str, Any]) -> int:
+        offset = self.file.tell()
+        self.file.write((json.dumps(record) + "\n").encode())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return offset
+
+    def add(self, files: List[str], candidates: Dict[str, Dict[str, Any]],
+            unmatched: List[Dict[str, Any]], missing: List[str]):
+        record = {"type": "batch", "files": files, "candidates": candidates,
+                  "unmatched": unmatched, "missing": missing}
+        self._index(record, self._write(record))
+
+    def _read(self, offset: int) -> Dict[str, Any]:
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def rows(self, pdf_files: List[str]) -> Iterator[Dict[str, Any]]:
+        """Candidates in file order, then unattributed ones by the position of their batch.
+
+        Files of one record are rarely adjacent in file order (cache hits and
+        fresh batches interleave), so the last PARSED_RECORDS records read are
+        kept parsed instead of re-reading one for nearly every row.
+        """
+        parsed: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        for file in pdf_files:
+            offset = self.offsets.get(file)
+            if offset is None:
+                continue
+            if offset in parsed:
+                parsed.move_to_end(offset)
+            else:
+                parsed[offset] = self._read(offset)
+                if len(parsed) > PARSED_RECORDS:
+                    parsed.popitem(last=False)
+            yield parsed[offset]["candidates"][file]
+        position = {file: i for i, file in enumerate(pdf_files)}
+        for _, offset in sorted(self.unmatched_offsets, key=lambda item: position.get(item[0], len(position))):
+            yield from self._read(offset)["unmatched"]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -1,46 +1,346 @@
-from src.init_agent import ExtractAgent
-from src.pdf_build import create_survey_report
+from src.metrics import metrics, profile_run
+import argparse
 import os
+import signal
+import sys
+import threading
 import logging
-import pandas as pd
-import kaleido
-import os
-if __name__ == "__main__":
-    import argparse
-    
-    # Set up logging
-    logging.basicConfig(level=logging.INFO, 
-                        format='%(asctime)s - %(levelname)s - %(message)s')
-    logger = logging.getLogger(__name__)
-    
-    # Parse arguments
-    parser = argparse.ArgumentParser(description="Process CVs from a directory")
-    parser.add_argument("path", help="Path to directory containing PDF files")
+
+COMMANDS = ("extract", "report", "all", "plan", "work", "merge", "serve")
+DEFAULT_JOURNAL = "./extraction_journal.jsonl"
+
+
+def add_extract_arguments(parser, with_path: bool = True):
+    if with_path:
+        parser.add_argument("path", help="Path to directory containing PDF files")
+    parser.add_argument("--key", help="Gemini API key (required with the gemini backend)")
+    parser.add_argument("--backend", choices=["gemini", "fake"], help="Model backend", default="gemini")
+    parser.add_argument("--fake_latency", type=float, help="Seconds per call of the fake backend", default=0.0)
+    parser.add_argument("--fake_error_rate", type=float, help="Fraction of fake backend calls failing with 503", default=0.0)
+    parser.add_argument("--model", help="Model name", default="gemini-2.0-flash")
+    parser.add_argument("--parallel_read", action="store_true", help="Read PDFs in a process pool")
+    parser.add_argument("--workers", type=int, help="Number of PDF reading processes", default=None)
+    parser.add_argument("--chunksize", type=int, help="PDFs sent to each reading process at a time", default=8)
+    parser.add_argument("--concurrency", type=int, help="LLM batches kept in flight at once", default=1)
+    parser.add_argument("--rpm", type=int, help="Client-side limit on LLM requests per minute", default=None)
+    parser.add_argument("--tpm", type=int, help="Client-side limit on LLM tokens per minute", default=None)
+    parser.add_argument("--token_budget", type=int, help="Estimated CV tokens packed into one LLM request", default=8000)
+    parser.add_argument("--max_batch_cvs", type=int, help="Maximum CVs in one LLM request", default=10)
+    parser.add_argument("--max_retries", type=int, help="Attempts per batch on rate limit or server errors", default=3)
+    parser.add_argument("--dead_letter", help="JSON lines file listing CVs that could not be extracted",
+                        default="./dead_letter.jsonl")
+    parser.add_argument("--journal", default=None,
+                        help=f"Journal file recording each completed batch (disabled if not set, {DEFAULT_JOURNAL} with --resume)")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Replay the journal (--journal, or {DEFAULT_JOURNAL}) and only extract the remaining CVs")
+    parser.add_argument("--stream", action="store_true",
+                        help="Use the streaming pipeline: bounded memory, rows written as batches finish")
+    parser.add_argument("--queue_size", type=int, help="Bound of the streaming pipeline queues", default=64)
+    parser.add_argument("--dedup", type=float, default=None, metavar="THRESHOLD",
+                        help="Send only one CV of each group of near duplicates (MinHash Jaccard >= THRESHOLD, e.g. 0.8)")
+    parser.add_argument("--dedup_mode", choices=["reuse", "collapse"], default="reuse",
+                        help="Give duplicates their representative's candidate, or leave them out of the data")
+    parser.add_argument("--compact", action="store_true",
+                        help="Drop repeated page headers/footers, page numbers and extra whitespace from the CV texts")
+    parser.add_argument("--trim_sections", action="store_true",
+                        help="Also drop sections without CandidateInfo fields (References, Hobbies, ...) and contact lines")
+    parser.add_argument("--max_cv_tokens", type=int, default=None,
+                        help="Cap each CV's text at this many estimated tokens")
+    parser.add_argument("--cache", help="Path of the SQLite extraction cache (disabled if not set)", default=None)
+    parser.add_argument("--cache_size", type=int, help="Maximum number of cached CVs", default=100_000)
+    parser.add_argument("--invalidate_cache", action="store_true",
+                        help="Drop cache entries made with a different prompt or schema before running")
+
+
+def add_report_arguments(parser):
     parser.add_argument("--output", help="Output PDF report file path", default="csv_report.pdf")
     parser.add_argument("--output_csv", help="Output CSV file path", default="candidate_data.csv")
-    parser.add_argument("--key", required=True, help="Gemini API key")
-    parser.add_argument("--model", help="Model name", default="gemini-2.0-flash")
     parser.add_argument("--save_csv", action="store_true", help="Save data to CSV file", default=True)
-    
-    args = parser.parse_args()
-    print(args)
+    parser.add_argument("--chart_format", choices=["png", "svg"], help="Raster PNG or vector SVG charts", default="png")
+    parser.add_argument("--render_workers", type=int, help="Processes rendering the report's charts", default=1)
+    parser.add_argument("--chart_backend", choices=["plotly", "reportlab"], default="plotly",
+                        help="Render charts with plotly/kaleido or draw them natively with ReportLab")
+    parser.add_argument("--figure_cache", default=None,
+                        help="Path of the SQLite cache of rendered charts (disabled if not set)")
+    parser.add_argument("--rules", default=None,
+                        help="Normalization rules file (default: src/normalization_rules.json)")
+    parser.add_argument("--normalize", action="store_true",
+                        help="Canonicalize university/department/college spellings with --rules before charting")
+    parser.add_argument("--segment_by", default=None,
+                        help="Also build one report per value of this column (e.g. department), in a process pool")
+    parser.add_argument("--segment_dir", default="./segment_reports",
+                        help="Folder of the segment reports and their index")
+    parser.add_argument("--report_workers", type=int, default=None,
+                        help="Processes building the segment reports (default: CPU count)")
+
+
+def add_summary_argument(parser):
+    parser.add_argument("--summary", default=None,
+                        help="Mergeable statistics file: written by the extraction alongside --data, "
+                             "and drawn by the report instead of loading --data")
+
+
+def add_queue_arguments(parser):
+    parser.add_argument("--queue", help="SQLite work queue shared by the sharded extraction workers",
+                        default="./extraction_queue.sqlite")
+    parser.add_argument("--lease", type=float, help="Seconds a worker holds a shard before others may take it over",
+                        default=300.0)
+    parser.add_argument("--max_attempts", type=int, help="Leases of a shard before it is given up on", default=3)
+
+
+def add_common_arguments(parser):
+    parser.add_argument("--data", help="Extracted candidates handed to the report (.arrow, or .csv)",
+                        default="./CVs_data.arrow")
+    parser.add_argument("--metrics_json", help="Write a JSON run summary of timers and counters here", default=None)
+    parser.add_argument("--metrics_prom", help="Write metrics in Prometheus text format here", default=None)
+    parser.add_argument("--profile", help="Dump cProfile and tracemalloc profiles with this file prefix", default=None)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Process CVs from a directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    extract = subparsers.add_parser("extract", help="Extract candidates from the CVs into the --data file")
+    add_extract_arguments(extract)
+    add_summary_argument(extract)
+    add_common_arguments(extract)
+    report = subparsers.add_parser("report", help="Build the PDF report from an existing --data file")
+    add_report_arguments(report)
+    add_summary_argument(report)
+    add_common_arguments(report)
+    everything = subparsers.add_parser("all", help="Extract, then build the report")
+    add_extract_arguments(everything)
+    add_report_arguments(everything)
+    add_summary_argument(everything)
+    add_common_arguments(everything)
+    plan = subparsers.add_parser("plan", help="Write a directory's PDFs as shards into the --queue work queue")
+    plan.add_argument("path", help="Path to directory containing PDF files")
+    plan.add_argument("--shard_size", type=int, help="PDFs per shard", default=50)
+    add_queue_arguments(plan)
+    add_common_arguments(plan)
+    work = subparsers.add_parser("work", help="Claim and extract shards of the --queue work queue until it is empty")
+    add_extract_arguments(work, with_path=False)
+    add_queue_arguments(work)
+    work.add_argument("--poll", type=float, default=1.0,
+                      help="Seconds between checks for expired leases once nothing is left to claim (0: exit)")
+    add_common_arguments(work)
+    merge = subparsers.add_parser("merge", help="Combine the finished shards of the --queue into --data, once")
+    merge.add_argument("--dead_letter", help="JSON lines file listing CVs that could not be extracted",
+                       default="./dead_letter.jsonl")
+    merge.add_argument("--summary", default=None,
+                       help="Also merge the summaries the workers saved per shard into this file")
+    add_queue_arguments(merge)
+    add_common_arguments(merge)
+    serve = subparsers.add_parser("serve", help="Run a local HTTP extraction service keeping the agent and charts warm")
+    add_extract_arguments(serve, with_path=False)
+    add_report_arguments(serve)
+    serve.add_argument("--host", help="Address the service listens on", default="127.0.0.1")
+    serve.add_argument("--port", type=int, help="Port the service listens on", default=8765)
+    serve.add_argument("--max_queue", type=int, default=256,
+                       help="CVs in progress above which submissions are refused with 429")
+    serve.add_argument("--batch_wait", type=float, default=0.2,
+                       help="Seconds a CV waits for others to share its LLM request")
+    add_common_arguments(serve)
+    return parser
+
+
+def build_agent(args, logger):
+    """The extraction agent (langchain, the model backend, PyMuPDF are only imported here)."""
+    from src.init_agent import ExtractAgent
+
     # Set environment variables
     os.environ['MODEL'] = args.model
-    os.environ["GEMINI_API_KEY"] = args.key
-    
+    if args.key:
+        os.environ["GEMINI_API_KEY"] = args.key
+    backend_options = {}
+    if args.backend == "fake":
+        backend_options = {"latency": args.fake_latency, "error_rate": args.fake_error_rate}
+
     # Initialize and run the extraction agent
     logger.info(f"Initializing extraction agent with model: {args.model}")
-    agent = ExtractAgent()
-    
+    agent = ExtractAgent(backend=args.backend,
+                         backend_options=backend_options,
+                         parallel_read=args.parallel_read,
+                         read_workers=args.workers,
+                         read_chunksize=args.chunksize,
+                         concurrency=args.concurrency,
+                         requests_per_minute=args.rpm,
+                         tokens_per_minute=args.tpm,
+                         cache_path=args.cache,
+                         cache_max_entries=args.cache_size,
+                         token_budget=args.token_budget,
+                         max_batch_cvs=args.max_batch_cvs,
+                         max_retries=args.max_retries,
+                         dead_letter_path=args.dead_letter,
+                         journal_path=args.journal or (DEFAULT_JOURNAL if args.resume else None),
+                         data_path=args.data,
+                         dedup_threshold=args.dedup,
+                         dedup_mode=args.dedup_mode,
+                         compact=args.compact,
+                         trim_sections=args.trim_sections,
+                         max_cv_tokens=args.max_cv_tokens,
+                         summary_path=getattr(args, "summary", None))
+    if agent.cache is not None and args.invalidate_cache:
+        agent.cache.invalidate(keep_fingerprint=agent.fingerprint)
+    return agent
+
+
+def run_extract(args, logger):
+    """Extraction stage."""
+    agent = build_agent(args, logger)
     logger.info(f"Processing CVs from directory: {args.path}")
-#    data = agent.run(args.path)  # Fixed: should pass the path, not the API key
-    data=pd.read_csv("./CVs_data.csv")
+    if args.stream:
+        if args.dedup:
+            logger.warning("--dedup is not applied by the streaming pipeline")
+        agent.run_streaming(args.path, queue_size=args.queue_size)
+    else:
+        agent.run(args.path, resume=args.resume)
+    if agent.cache is not None:
+        logger.info(f"Cache stats: {agent.cache.stats()}")
+
+
+def run_plan(args, logger):
+    """Sharded extraction, step 1: the manifest of PDFs in the work queue."""
+    from src.work_queue import WorkQueue
+
+    queue = WorkQueue(args.queue, args.lease, args.max_attempts)
+    pdf_files = sorted(os.path.join(args.path, name) for name in os.listdir(args.path) if name.endswith(".pdf"))
+    queue.plan(pdf_files, args.shard_size, os.path.splitext(args.data)[1] or ".arrow")
+    queue.close()
+
+
+def run_work(args, logger):
+    """Sharded extraction, step 2: one worker, any number of them may run at once."""
+    from src.work_queue import WorkQueue, run_worker
+
+    agent = build_agent(args, logger)
+    # Shards are the unit of retry, so workers keep no journal of their own
+    agent.journal_path = None
+    queue = WorkQueue(args.queue, args.lease, args.max_attempts)
+    completed = run_worker(queue, agent, poll_seconds=args.poll)
+    logger.info(f"Worker done: {completed} shards extracted, queue {queue.status()}")
+    queue.close()
+
+
+def run_merge(args, logger):
+    """Sharded extraction, step 3: the shards' outputs combined into --data."""
+    from src.work_queue import WorkQueue
+
+    queue = WorkQueue(args.queue, args.lease, args.max_attempts)
+    queue.merge(args.data, args.dead_letter, args.summary)
+    queue.close()
+
+
+def run_serve(args, logger):
+    """Service mode: one warm agent serving extraction and reports over HTTP until interrupted."""
+    from src.service import ExtractionService, serve
+
+    agent = build_agent(args, logger)
+    report_options = {"chart_format": args.chart_format, "render_workers": args.render_workers,
+                      "chart_backend": args.chart_backend, "figure_cache": args.figure_cache,
+                      "rules": args.rules, "normalize": args.normalize}
+    service = ExtractionService(agent, max_queue=args.max_queue, batch_wait=args.batch_wait,
+                                read_workers=args.workers or 2, report_options=report_options)
+    service.warm_up()
+    server = serve(service, args.host, args.port)
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    stop.wait()
+    logger.info("Stopping the extraction service")
+    server.shutdown()
+    service.stop()
+
+
+def report_from_summary(args, logger):
+    """Report stage drawn from a summary file alone, the candidate rows are never loaded."""
+    from src.pdf_build import create_survey_report
+    from src.summary import CandidateSummary
+
+    if args.segment_by:
+        logger.warning("--segment_by needs the candidate rows, it is ignored with --summary")
+    summary = CandidateSummary.load(args.summary)
+    if args.normalize:
+        from src.normalize import Normalizer
+        summary = summary.normalized(Normalizer.from_file(args.rules) if args.rules else Normalizer())
+    logger.info(f"Creating survey report of {summary.rows} candidates from {args.summary}: {args.output}")
+    create_survey_report(None, args.output, chart_format=args.chart_format,
+                         render_workers=args.render_workers, chart_backend=args.chart_backend,
+                         figure_cache=args.figure_cache, summary=summary)
+    if args.save_csv:
+        logger.info("No CSV export from a summary, it holds no candidate rows")
+
+
+def run_report(args, logger):
+    """Report stage: reportlab, and plotly/kaleido only with the plotly chart backend."""
+    from src.candidate_store import export_csv, load_candidates
+    from src.pdf_build import create_survey_report
+
+    if args.summary:
+        report_from_summary(args, logger)
+        return
+
+    # Reload what the extraction wrote; the report needs every column
+    data=load_candidates(args.data)
+    if args.normalize:
+        from src.utiles import extra_preprocessing
+        data = extra_preprocessing(data, args.rules)
     # Create the PDF report
-    logger.info(f"Creating survey report: {args.output}")
-    create_survey_report(data, args.output)
-    
+    if args.segment_by:
+        from src.segment_reports import create_segment_reports
+        logger.info(f"Creating survey report {args.output} and one per {args.segment_by} in {args.segment_dir}")
+        index = create_segment_reports(data, args.segment_by, args.segment_dir, total_output=args.output,
+                                       workers=args.report_workers, chart_format=args.chart_format,
+                                       render_workers=args.render_workers, chart_backend=args.chart_backend,
+                                       figure_cache=args.figure_cache)
+        logger.info(f"{len(index)} reports built, index in {os.path.join(args.segment_dir, 'index.pdf')}")
+    else:
+        logger.info(f"Creating survey report: {args.output}")
+        create_survey_report(data, args.output, chart_format=args.chart_format,
+                             render_workers=args.render_workers, chart_backend=args.chart_backend,
+                             figure_cache=args.figure_cache)
+
     # Save CSV if requested
     if args.save_csv:  # Fixed: using the correct argument name
         logger.info(f"Saving data to CSV: {args.output_csv}")
-        data.to_csv(args.output_csv, index=False)
-        print("Data saved to CSV successfully")
\ No newline at end of file
+        export_csv(data, args.output_csv)
+        print("Data saved to CSV successfully")
+
+
+if __name__ == "__main__":
+    # Set up logging
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger(__name__)
+
+    # Parse arguments; without a subcommand the old single-command form runs `all`
+    argv = sys.argv[1:]
+    if argv and argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv = ["all"] + argv
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "backend", None) == "gemini" and not args.key:
+        parser.error("--key is required with the gemini backend")
+    if getattr(args, "stream", False) and args.resume:
+        parser.error("--resume replays the journal, which the streaming pipeline does not keep; drop --stream or --resume")
+    print(args)
+
+    with profile_run(args.profile):
+        if args.command in ("extract", "all"):
+            run_extract(args, logger)
+        if args.command in ("report", "all"):
+            run_report(args, logger)
+        if args.command == "plan":
+            run_plan(args, logger)
+        if args.command == "work":
+            run_work(args, logger)
+        if args.command == "merge":
+            run_merge(args, logger)
+        if args.command == "serve":
+            run_serve(args, logger)
+
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+        logger.info(f"Run summary written to {args.metrics_json}")
+    if args.metrics_prom:
+        metrics.write_prometheus(args.metrics_prom)
+        logger.info(f"Prometheus metrics written to {args.metrics_prom}")
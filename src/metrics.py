@@ -0,0 +1,153 @@
+import cProfile
+import functools
+import json
+import logging
+import pstats
+import threading
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter, time
+from typing import Any, Dict, List, Optional
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def summary(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": self.count, "sum": round(self.sum, 6), "buckets": buckets}
+
+
+class Metrics:
+    """Process-wide counters, stage timers and latency histograms.
+
+    Names follow Prometheus conventions (`*_total` counters, `*_seconds`
+    histograms). Recording is cheap enough to stay on in production.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time()
+            self.counters: Dict[str, float] = {}
+            self.timers: Dict[str, float] = {}
+            self.histograms: Dict[str, Histogram] = {}
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).observe(value)
+
+    @contextmanager
+    def timer(self, stage: str, histogram: Optional[str] = None):
+        """Add the wall time of the block to the stage timer (and to a histogram if named)."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            with self._lock:
+                self.timers[stage] = self.timers.get(stage, 0.0) + elapsed
+            if histogram:
+                self.observe(histogram, elapsed)
+
+    def timed(self, stage: str):
+        """Decorator form of timer()."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started": self.started,
+                "wall_seconds": round(time() - self.started, 6),
+                "stages_seconds": {name: round(value, 6) for name, value in self.timers.items()},
+                "counters": dict(self.counters),
+                "histograms": {name: h.summary() for name, h in self.histograms.items()},
+            }
+
+    def write_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def prometheus_text(self, prefix: str = "cvs_reporter") -> str:
+        summary = self.summary()
+        lines: List[str] = []
+        for name, value in sorted(summary["counters"].items()):
+            lines += [f"# TYPE {prefix}_{name} counter", f"{prefix}_{name} {value}"]
+        stage_metric = f"{prefix}_stage_seconds_total"
+        lines.append(f"# TYPE {stage_metric} counter")
+        for stage, value in sorted(summary["stages_seconds"].items()):
+            lines.append(f'{stage_metric}{{stage="{stage}"}} {value}')
+        for name, histogram in sorted(summary["histograms"].items()):
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for bound, count in histogram["buckets"].items():
+                lines.append(f'{prefix}_{name}_bucket{{le="{bound}"}} {count}')
+            lines += [f"{prefix}_{name}_sum {histogram['sum']}", f"{prefix}_{name}_count {histogram['count']}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.prometheus_text())
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def profile_run(prefix: Optional[str], top: int = 30):
+    """Opt-in cProfile + tracemalloc for the block.
+
+    Writes `{prefix}.prof` (load with pstats or snakeviz), `{prefix}_cpu.txt`
+    with the top functions by cumulative time and `{prefix}_memory.txt` with
+    the top allocation sites. No-op without a prefix.
+    """
+    if not prefix:
+        yield
+        return
+    logger = logging.getLogger(__name__)
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        profiler.dump_stats(f"{prefix}.prof")
+        with open(f"{prefix}_memory.txt", "w") as f:
+            f.write(f"current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n\n")
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
+        with open(f"{prefix}_cpu.txt", "w") as f:
+            pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(top)
+        logger.info(f"Profiles written to {prefix}.prof, {prefix}_cpu.txt and {prefix}_memory.txt "
+                    f"(peak traced memory {peak / 1e6:.1f} MB)")
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.metrics import metrics
+
+DEFAULT_RULES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "normalization_rules.json")
+WHITESPACE = re.compile(r"\s+")
+NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def load_rules(path: str = DEFAULT_RULES) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ngrams(text: str, n: int = 3) -> set:
+    """Character n-grams of a space-padded string."""
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+class NgramIndex:
+    """Maps character n-grams to the keys containing them.
+
+    Looking a key up only touches keys sharing at least min_shared n-grams
+    with it, so near duplicates are found without comparing every pair of
+    values. N-grams found in more than max_postings keys (" un", "uni", ...)
+    stop being indexed: their postings would cover almost every value.
+    """
+
+    def __init__(self, n: int = 3, max_postings: int = 200, min_shared: int = 2):
+        self.n = n
+        self.max_postings = max_postings
+        self.min_shared = min_shared
+        self.postings: Dict[str, List[str]] = {}
+        self.common: set = set()
+        self.grams: Dict[str, set] = {}
+
+    def add(self, key: str):
+        grams = ngrams(key, self.n)
+        self.grams[key] = grams
+        for gram in grams - self.common:
+            posting = self.postings.setdefault(gram, [])
+            posting.append(key)
+            if len(posting) > self.max_postings:
+                self.common.add(gram)
+                del self.postings[gram]
+
+    def best_match(self, key: str, threshold: float) -> Optional[str]:
+        """The indexed key with the highest n-gram Jaccard similarity to key, if it reaches threshold."""
+        grams = ngrams(key, self.n)
+        rare = grams - self.common
+        shared = Counter(other for gram in rare for other in self.postings.get(gram, ()))
+        min_shared = min(self.min_shared, len(rare))
+        best, best_score = None, threshold
+        for other, hits in shared.items():
+            if hits < min_shared:
+                continue
+            other_grams = self.grams[other]
+            common = len(grams & other_grams)
+            score = common / (len(grams) + len(other_grams) - common)
+            if score >= best_score:
+                best, best_score = other, score
+        return best
+
+
+class FieldNormalizer:
+    """Canonicalizes one column: ordered regex rules first, then fuzzy deduplication.
+
+    Every raw value is resolved once and remembered in self.mapping, so
+    later calls only look at values they have not seen before.
+    """
+
+    def __init__(self, rules: List[Dict[str, str]], fuzzy: bool = False, threshold: float = 0.7,
+                 abbreviations: Optional[Dict[str, str]] = None, stopwords: Iterable[str] = (), n: int = 3):
+        self.rules = [(re.compile(rule["pattern"], re.IGNORECASE), rule["value"]) for rule in rules]
+        self.fuzzy = fuzzy
+        self.threshold = threshold
+        self.abbreviations = abbreviations or {}
+        self.stopwords = set(stopwords)
+        self.index = NgramIndex(n)
+        self.representatives: Dict[str, str] = {}  # fuzzy key -> canonical value
+        self.mapping: Dict[Any, Any] = {}
+
+    def fuzzy_key(self, value: str) -> str:
+        """Lowercase tokens with punctuation, stopwords and abbreviations resolved, in sorted order."""
+        tokens = []
+        for token in NON_ALNUM.sub(" ", value.lower()).split():
+            token = self.abbreviations.get(token, token)
+            tokens.extend(word for word in token.split() if word not in self.stopwords)
+        return " ".join(sorted(tokens))
+
+    def canonical(self, value: str) -> str:
+        """Representative of value's near-duplicate cluster, value itself if it starts a new one."""
+        key = self.fuzzy_key(value)
+        if key in self.representatives:
+            return self.representatives[key]
+        match = self.index.best_match(key, self.threshold) if key else None
+        if match is not None:
+            self.representatives[key] = self.representatives[match]
+        else:
+            self.representatives[key] = value
+            self.index.add(key)
+        return self.representatives[key]
+
+    def register(self, value: str):
+        """Make a rule's output the canonical form of its own cluster."""
+        key = self.fuzzy_key(value)
+        if key not in self.representatives:
+            self.representatives[key] = value
+            self.index.add(key)
+
+    def resolve(self, values: pd.Series, counts: np.ndarray):
+        """Add the distinct, unseen values (with their row counts) to self.mapping."""
+        new = np.array([value not in self.mapping for value in values], dtype=bool)
+        if not new.any():
+            return
+        values, counts = values[new].reset_index(drop=True), counts[new]
+        cleaned = values.astype(str).str.strip().str.replace(WHITESPACE, " ", regex=True)
+        resolved = pd.Series([None] * len(values), dtype=object)
+        for pattern, value in self.rules:
+            hit = resolved.isna() & cleaned.str.contains(pattern)
+            resolved[hit] = value
+        if self.fuzzy:
+            for value in dict.fromkeys(resolved.dropna()):
+                self.register(value)
+            # Most frequent spellings first, so they become their cluster's canonical form
+            for i in np.argsort(-counts, kind="stable"):
+                if pd.isna(resolved[i]):
+                    resolved[i] = self.canonical(cleaned[i])
+        resolved = resolved.fillna(cleaned)
+        self.mapping.update(zip(values, resolved))
+
+    def normalize(self, series: pd.Series) -> pd.Series:
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            categories = pd.Series(series.cat.categories)
+            self.resolve(categories, np.bincount(codes[codes >= 0], minlength=len(categories)))
+            new_codes, new_categories = pd.factorize(categories.map(self.mapping))
+            return pd.Series(pd.Categorical.from_codes(np.where(codes >= 0, new_codes[codes], -1), new_categories),
+                             index=series.index, name=series.name)
+        codes, uniques = pd.factorize(series)
+        self.resolve(pd.Series(uniques), np.bincount(codes[codes >= 0], minlength=len(uniques)))
+        return series.map(self.mapping)
+
+
+class Normalizer:
+    """Rule-driven canonicalization of the candidate columns named in the rules file."""
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None):
+        rules = rules if rules is not None else load_rules()
+        self.logger = logging.getLogger(__name__)
+        self.fields = {
+            field: FieldNormalizer(config.get("rules", []), config.get("fuzzy", False), config.get("threshold", 0.7),
+                                   rules.get("abbreviations"), rules.get("stopwords", ()), rules.get("ngram", 3))
+            for field, config in rules.get("fields", {}).items()
+        }
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_RULES) -> "Normalizer":
+        return cls(load_rules(path))
+
+    @metrics.timed("normalize")
+    def normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Return a copy of df with every configured column canonicalized."""
+        df = df.copy()
+        for field, normalizer in self.fields.items():
+            if field not in df.columns:
+                continue
+            before = df[field].nunique()
+            df[field] = normalizer.normalize(df[field])
+            self.logger.info(f"Normalized {field}: {before} distinct values -> {df[field].nunique()}")
+        return df
+
+    def mappings(self) -> Dict[str, Dict[Any, Any]]:
+        """Raw value -> canonical value tables built so far, per column."""
+        return {field: dict(normalizer.mapping) for field, normalizer in self.fields.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.candidate_store import load_candidates
+
+    parser = argparse.ArgumentParser(description="Show how the normalization rules collapse a candidate file")
+    parser.add_argument("data", help="Candidate file (.arrow or .csv)")
+    parser.add_argument("--rules", help="Normalization rules file", default=DEFAULT_RULES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    normalizer = Normalizer.from_file(args.rules)
+    normalizer.normalize(load_candidates(args.data))
+    for field, mapping in normalizer.mappings().items():
+        changed = {raw: canonical for raw, canonical in mapping.items() if raw != canonical}
+        print(json.dumps({field: changed}, indent=2, ensure_ascii=False))
@@ -1,25 +1,30 @@
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-import os
-import json
+import io
+import logging
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as ReportLabImage, ListFlowable, ListItem, PageBreak
 from reportlab.lib.units import inch
-from PIL import Image as PILImage, ImageDraw, ImageFont
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.output_parsers import StrOutputParser
 import random
-import plotly.io as pio
-import ast
-pio.kaleido.scope.chromium_args = tuple([arg for arg in pio.kaleido.scope.chromium_args if arg != "--disable-dev-shm-usage"])
-#pio.kaleido.scope.chromium_args = tuple([arg for arg in pio.kaleido.scope.chromium_args if arg != "--disable-dev-shm-usage"])
+from src.metrics import metrics
+from src.report_stats import column_stats
+
+CHART_BACKENDS = ("plotly", "reportlab")
+
 class NotionDataPDF:
-    def __init__(self, output_filename, title="Data Visualization Report", pagesize=A4):
-        """Initialize PDF document with Notion-like styling"""
+    def __init__(self, output_filename, title="Data Visualization Report", pagesize=A4,
+                 chart_format="png", render_workers=1, chart_backend="plotly", figure_cache=None):
+        """Initialize PDF document with Notion-like styling
+
+        With chart_backend="plotly" charts are rendered together at build time,
+        as PNG or as SVG vector drawings (chart_format), with render_workers
+        kaleido processes, and kept in memory; figure_cache is the path of a
+        FigureCache reusing images of figures already rendered by earlier
+        builds. chart_backend="reportlab" draws them natively as vector
+        graphics, without plotly, kaleido or a browser.
+        """
+        if chart_backend not in CHART_BACKENDS:
+            raise ValueError(f"Unknown chart backend {chart_backend!r}, expected one of {CHART_BACKENDS}")
         self.output_filename = output_filename
         self.title = title
         self.document = SimpleDocTemplate(
@@ -75,9 +80,18 @@ class NotionDataPDF:
         # Initialize content elements list
         self.elements = []
         
-        # Create directory for chart images
-        self.img_dir = "chart_images"
-        os.makedirs(self.img_dir, exist_ok=True)
+        # Figures waiting to be rendered at build time: (slot, key, fig, width, height, dpi)
+        self.pending_figures = []
+        self.chart_backend = chart_backend
+        self.renderer = None
+        self.figure_cache = None
+        self.logger = logging.getLogger(__name__)
+        if chart_backend == "plotly":
+            from src.chart_render import PlotlyRenderer
+            self.renderer = PlotlyRenderer(chart_format, render_workers)
+            if figure_cache:
+                from src.cache import FigureCache
+                self.figure_cache = FigureCache(figure_cache)
     
     def add_heading(self, text, level=1):
         """Add a heading with specified level (1-2)"""
@@ -99,19 +113,51 @@ class NotionDataPDF:
         self.elements.append(PageBreak())
     
     def add_plotly_figure(self, fig, width=6.5, height=4, dpi=300, caption=None):
-        """Add a Plotly figure to the PDF"""
-        # Generate unique filename for the image
-        img_count = len([f for f in os.listdir(self.img_dir) if f.endswith('.png')])
-        img_path = os.path.join(self.img_dir, f"chart_{img_count}.png")
-        
-        # Save the figure as an image
-        fig.write_image(img_path, width=width*dpi, height=height*dpi)
+        """Add a Plotly figure to the PDF, rendered with the others when the PDF is built
+
+        Returns the figure's cache key, a hash of its spec and rendered size.
+        """
+        from src.cache import figure_key
+        key = figure_key(fig.to_json(), self.renderer.fmt, int(width*dpi), int(height*dpi))
         
-        # Add the image to the PDF
-        img = ReportLabImage(img_path, width=width*inch, height=height*inch)
-        self.elements.append(img)
+        # Keep a slot for the image, filled in by render_figures()
+        slot = Spacer(width*inch, height*inch)
+        self.pending_figures.append((slot, key, fig, width, height, dpi))
+        self.elements.append(slot)
+        self._add_caption(caption)
         
-        # Add caption if provided
+        return key
+    
+    def add_drawing(self, drawing, caption=None):
+        """Add a ReportLab drawing (already sized in points) to the PDF"""
+        self.elements.append(drawing)
+        self._add_caption(caption)
+    
+    def add_histogram(self, labels, counts, title, xaxis_title, yaxis_title, width=7.5, height=3.5, caption=None):
+        """Add a distribution histogram of precomputed bin counts, drawn with the report's chart backend"""
+        if self.chart_backend == "reportlab":
+            from src.rl_charts import histogram_drawing
+            self.add_drawing(histogram_drawing(labels, counts, title, xaxis_title, yaxis_title, width*inch, height*inch),
+                             caption=caption)
+        else:
+            from src.chart_render import plotly_histogram
+            self.add_plotly_figure(plotly_histogram(labels, counts, title, xaxis_title, yaxis_title),
+                                   width=width, height=height, caption=caption)
+    
+    def add_bar_chart(self, labels, counts, bar_colors, title, xaxis_title, yaxis_title,
+                      width=7.5, height=10, caption=None):
+        """Add a horizontal bar chart, one (r, g, b) colour per bar, drawn with the report's chart backend"""
+        if self.chart_backend == "reportlab":
+            from src.rl_charts import hbar_drawing
+            self.add_drawing(hbar_drawing(labels, counts, bar_colors, title, xaxis_title, yaxis_title,
+                                          width*inch, height*inch), caption=caption)
+        else:
+            from src.chart_render import plotly_hbar
+            self.add_plotly_figure(plotly_hbar(labels, counts, bar_colors, title, xaxis_title, yaxis_title),
+                                   width=width, height=height, caption=caption)
+    
+    def _add_caption(self, caption=None):
+        """Add the caption (if provided) and spacing below a chart"""
         if caption:
             caption_style = ParagraphStyle(
                 name='Caption',
@@ -122,8 +168,6 @@ class NotionDataPDF:
             self.elements.append(Paragraph(caption, caption_style))
         
         self.elements.append(Spacer(1, 0.2*inch))
-        
-        return img_path
     
     def add_table_from_dataframe(self, df, max_rows=10, include_index=False, colWidths=None):
         """Add a table from a pandas DataFrame"""
@@ -166,72 +210,73 @@ class NotionDataPDF:
         self.elements.append(Spacer(1, 0.2*inch))
     
     def create_title_page(self, title_text, subtitle_text=None, date_range=None):
-        """Create a separate title page at the BEGINNING of the document"""
-        # Create a new document just for the title page
-        title_doc = SimpleDocTemplate(
-            "title_page.pdf",
-            pagesize=self.document.pagesize,
-            rightMargin=self.document.rightMargin,
-            leftMargin=self.document.leftMargin,
-            topMargin=self.document.topMargin,
-            bottomMargin=self.document.bottomMargin
-        )
-        
-        title_elements = []
-        
-        # Add spacer to push content to middle
-        title_elements.append(Spacer(1, 2*inch))
-        
-        # Add main title with larger font
-        title_style = ParagraphStyle(
-            name='CoverTitle',
-            parent=self.styles['NotionTitle'],
-            fontSize=36,
-            alignment=1  # Center alignment
-        )
-        title_elements.append(Paragraph(title_text, title_style))
-        
-        # Add subtitle if provided
-        if subtitle_text:
-            subtitle_style = ParagraphStyle(
-                name='CoverSubtitle',
-                parent=self.styles['NotionH1'],
-                fontSize=18,
-                alignment=1,  # Center alignment
-                spaceAfter=36
-            )
-            title_elements.append(Spacer(1, 0.5*inch))
-            title_elements.append(Paragraph(subtitle_text, subtitle_style))
-        
-        # Add date range if provided
-        if date_range:
-            date_style = ParagraphStyle(
-                name='CoverDate',
-                parent=self.styles['NotionText'],
-                fontSize=14,
-                alignment=1  # Center alignment
-            )
-            title_elements.append(Spacer(1, 0.5*inch))
-            title_elements.append(Paragraph(f"Study Period: {date_range}", date_style))
-        
-        # Build the title page
-        title_doc.build(title_elements)
-        
-        # Now add this at the beginning of our document
+        """Put the report title and a page break at the BEGINNING of the document
+
+        This used to also build a separate cover (title_text, subtitle_text and
+        date_range) into title_page.pdf, which nothing ever merged into the
+        report, so the arguments are kept for callers but no file is written.
+        """
         self.elements.insert(0, PageBreak())
-        
-        # Add title to main document as well (after page break)
         self.elements.insert(0, Paragraph(self.title, self.styles['NotionTitle']))
     
+    def render_figures(self):
+        """Render every pending figure in one batch and put the images in their slots
+
+        Images stay in memory; figures found in the figure cache (or repeated
+        within the report) are not rendered again.
+        """
+        if not self.pending_figures:
+            return
+        from src.chart_render import svg_flowable
+        images = {}
+        if self.figure_cache is not None:
+            for _, key, *_ in self.pending_figures:
+                if key not in images:
+                    image = self.figure_cache.get(key)
+                    if image is not None:
+                        images[key] = image
+        missing = {}
+        for _, key, fig, width, height, dpi in self.pending_figures:
+            if key not in images and key not in missing:
+                missing[key] = (fig, int(width*dpi), int(height*dpi))
+        for key, image in zip(missing, self.renderer.render_all(list(missing.values()))):
+            images[key] = image
+            if self.figure_cache is not None:
+                self.figure_cache.put(key, image)
+        rendered = {}
+        for slot, key, _, width, height, _ in self.pending_figures:
+            if self.renderer.fmt == "svg":
+                rendered[id(slot)] = svg_flowable(images[key], width*inch, height*inch)
+            else:
+                rendered[id(slot)] = ReportLabImage(io.BytesIO(images[key]), width=width*inch, height=height*inch)
+        self.elements = [rendered.get(id(element), element) for element in self.elements]
+        self.pending_figures = []
+    
     def build(self):
         """Build and save the PDF document"""
-        self.document.build(self.elements)
+        self.render_figures()
+        if self.figure_cache is not None:
+            self.logger.info(f"Figure cache: {self.figure_cache.stats()}")
+            self.figure_cache.close()
+            self.figure_cache = None
+        with metrics.timer("report_build"):
+            self.document.build(self.elements)
         return self.output_filename
 
-def create_survey_report(df, output_pdf="survey_report.pdf"):
-    """Create a comprehensive survey report PDF with visualizations"""
+@metrics.timed("create_survey_report")
+def create_survey_report(df, output_pdf="survey_report.pdf", chart_format="png", render_workers=1,
+                         chart_backend="plotly", figure_cache=None, summary=None, stats=None,
+                         title="Survey Analysis Report"):
+    """Create a comprehensive survey report PDF with visualizations
+
+    With a summary (src.summary.CandidateSummary), or with stats already
+    computed (column -> ColumnStats, e.g. one segment of
+    grouped_column_stats), the charts are drawn from them and df is not needed.
+    """
     # Initialize the PDF
-    report = NotionDataPDF(output_pdf, "Survey Analysis Report")
+    report = NotionDataPDF(output_pdf, title,
+                           chart_format=chart_format, render_workers=render_workers, chart_backend=chart_backend,
+                           figure_cache=figure_cache)
     #date_range = f"{start_date} to {end_date}" if start_date and end_date else None
     report.create_title_page("CVS Survey Analysis", "Comprehensive Results")
     report.add_spacer()
@@ -240,36 +285,23 @@ def create_survey_report(df, output_pdf="survey_report.pdf"):
 #    report.add_paragraph(f"{report.get_summary(df)}")
 #    
     
-    # Display sample of the dat
+    # Every column's distribution, skills parsed and counted once
+    if stats is None:
+        stats = summary.column_stats() if summary is not None else column_stats(df)
     loop=0
     # Loop through each column and create a histogram
-    for index, column in enumerate(df.columns):
+    for index, column in enumerate(stats):
         # Add a page break before each new section (except the first one)
 
             
         report.add_heading(f"{column} Distribution", 1)
         report.add_paragraph(f"The chart below shows the distribution of responses across {column}:")
         #report.add_spacer()
-        print(df[column].iloc[-1],column,type(df[column].iloc[-1]) ,type (df[column].iloc[-1]) is str  )
-        if pd.api.types.is_numeric_dtype(df[column]) or (
-            isinstance(df[column].iloc[-1], str) and not df[column].iloc[-1].startswith("[")
-        ):            
-            fig = go.Figure()
-            fig.add_trace(go.Histogram(
-                x=df[column], 
-                marker_color='blue', 
-                opacity=0.7
-            ))
-            fig.update_layout(
-                title=f"{column} Distribution",
-                xaxis_title=f"{column}",
-                yaxis_title="Number of Responses",
-                bargap=.9,
-                width=2400,    # Increase the width of the figure
-                height=2400,font=dict(size=18)      # Increase the height of the figure
-            )
-            fig.update_xaxes(tickmode='linear', dtick=1,    showticklabels=True)
-            report.add_plotly_figure(fig, width=7.5, height=3.5, caption=f"Figure {index+1}: Distribution of responses by {column}")
+        column_stat = stats[column]
+        if column_stat.kind == "histogram":
+            report.add_histogram(column_stat.labels, column_stat.counts, f"{column} Distribution", f"{column}",
+                                 "Number of Responses", width=7.5, height=3.5,
+                                 caption=f"Figure {index+1}: Distribution of responses by {column}")
             loop+=1
             if loop%2==0:
                 report.add_page_break()
@@ -277,52 +309,22 @@ def create_survey_report(df, output_pdf="survey_report.pdf"):
             if (loop%2!=0):
                report.add_page_break()
 
-                
-            # Handle skills column with ast.literal_eval
-            skills_counts = {}
-            try:
-                for skills in  df["skills"]:
-                    for skill in  ast.literal_eval(skills):
-                        if len(skill)>25:
-                            skill=skill[:25]
-                        skills_counts[skill] = skills_counts.get(skill, 0) + 1
-                sorted_skills=sorted(list(skills_counts.items()), key=lambda x: x[1], reverse=True)
-                max_indexs=80
-                sorted_skills_keys=[ i[0] for i in sorted_skills][:max_indexs]
-                sorted_skills_values=[ i[1] for i in sorted_skills][:max_indexs]
-
-                skills =sorted_skills_keys
-                counts = sorted_skills_values
-
-                # Generate a random color for each skill
-                colors = [f'rgb({random.randint(50, 200)},{random.randint(50, 200)},{random.randint(50, 200)})' for _ in skills]
-                print
-                fig = go.Figure()
-                fig.add_trace(go.Bar(
-                    x=counts,
-                    y=skills,
-                    orientation="h",  # Horizontal bars
-                    marker=dict(color=colors)  # Assign colors
-                ))
+            if column_stat.error:
+                print(column_stat.error)
+                report.add_paragraph(f"{column_stat.error}")
+                continue
 
-                fig.update_layout(
-                    title=f"{column} Distribution",
-                    xaxis_title="Number of Responses",
-                    yaxis_title=f"{column}",
-                    bargap=.55,
-                    width=2400,    # Increase the width
-                    height=2500,   # Increase the height
-                    font=dict(size=20),
-                    showlegend=False
-                )
+            skills = column_stat.labels
+            counts = column_stat.counts
 
-                fig.update_xaxes(tickmode='linear', dtick=1, showticklabels=True)
-                
-                report.add_plotly_figure(fig, width=7.5, height=10, caption=f"Figure {index+1}: Distribution of responses by {column}")
-            except Exception as e:
-                print(e)
-                report.add_paragraph(f"{e}")
-                continue
+            # Generate a random color for each skill, seeded by the skill so cached figures stay valid
+            bar_colors = []
+            for skill in skills:
+                rng = random.Random(skill)
+                bar_colors.append((rng.randint(50, 200), rng.randint(50, 200), rng.randint(50, 200)))
+            report.add_bar_chart(skills, counts, bar_colors, f"{column} Distribution", "Number of Responses",
+                                 f"{column}", width=7.5, height=10,
+                                 caption=f"Figure {index+1}: Distribution of responses by {column}")
                 
         # Add the figure to the PDF
 
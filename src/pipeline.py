@@ -0,0 +1,184 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.async_engine import AsyncExtractionEngine
+from src.batching import match_by_id, tag_cv
+from src.cache import file_hash
+from src.candidate_store import row_writer
+from src.metrics import metrics
+from src.rate_limit import estimate_tokens
+from src.retry import write_dead_letter
+from src.summary import CandidateSummary
+
+DONE = None  # end-of-stream marker passed through the queues
+
+
+def iter_pdfs(path: str) -> Iterator[str]:
+    """Yield the PDF files of a directory without listing it up front."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name.endswith(".pdf") and not entry.name.startswith(".") and entry.is_file():
+                yield entry.path
+
+
+class StreamingPipeline:
+    """discover -> read -> batch -> LLM -> validate -> write, with all stages overlapping.
+
+    Stages are coroutines connected by bounded queues, so a slow stage
+    holds back the ones before it and only the CVs in the queues and the
+    batches in flight are ever held in memory. Rows are appended to the
+    output file in completion order as soon as their batch returns.
+    """
+
+    def __init__(self, agent, output_path: str = "./CVs_data.arrow", queue_size: int = 64):
+        self.agent = agent
+        self.logger = agent.logger
+        self.queue_size = queue_size
+        self.summary = CandidateSummary() if agent.summary_path else None
+        self.writer = row_writer(output_path, agent.get_data_as_dict, self.summary)
+        self.texts: Dict[int, str] = {}
+        self.files: Dict[int, str] = {}
+        self.hashes: Dict[int, Optional[str]] = {}
+        self.dead_letter: List[Dict[str, str]] = []
+        self.cvs = 0
+        self.cache_hits = 0
+        self.requests = 0
+
+    async def _discover(self, path: str, files_q: asyncio.Queue, readers: int):
+        for file in iter_pdfs(path):
+            await files_q.put(file)
+        for _ in range(readers):
+            await files_q.put(DONE)
+
+    async def _read(self, executor, files_q: asyncio.Queue, texts_q: asyncio.Queue):
+        from src.init_agent import read_pdf_text
+
+        loop = asyncio.get_running_loop()
+        agent = self.agent
+        while (file := await files_q.get()) is not DONE:
+            pdf_hash = None
+            if agent.cache is not None:
+                # Hashing is a fraction of parsing, cached CVs are never opened
+                pdf_hash = await loop.run_in_executor(executor, file_hash, file)
+                cached = agent.cache.get(pdf_hash, agent.model_name, agent.fingerprint)
+                if cached is not None:
+                    # Cached CVs go straight to the output
+                    self.cache_hits += 1
+                    self.writer.write([cached])
+                    continue
+            _, text, error, pages, raw_chars = await loop.run_in_executor(
+                executor, read_pdf_text, file, agent.compaction)
+            metrics.inc("pdf_files_read_total")
+            metrics.inc("pages_parsed_total", pages)
+            agent.count_chars(raw_chars, text, error)
+            if error:
+                metrics.inc("pdf_read_errors_total")
+                self.logger.error(f"Error reading {file}: {error}")
+                self.dead_letter.append({"cv": file, "reason": f"could not read PDF: {error}"})
+                continue
+            await texts_q.put((file, text, pdf_hash))
+        await texts_q.put(DONE)
+
+    async def _batch(self, texts_q: asyncio.Queue, batch_q: asyncio.Queue, readers: int, dispatchers: int):
+        """Next-fit packing of the incoming CVs against the agent's token budget."""
+        agent = self.agent
+        batch: List[int] = []
+        load = 0
+        finished = 0
+        while finished < readers:
+            item = await texts_q.get()
+            if item is DONE:
+                finished += 1
+                continue
+            file, text, pdf_hash = item
+            index = self.cvs
+            self.cvs += 1
+            self.texts[index], self.files[index], self.hashes[index] = text, file, pdf_hash
+            tokens = estimate_tokens(tag_cv(index, text))
+            full = agent.max_batch_cvs is not None and len(batch) >= agent.max_batch_cvs
+            if batch and (load + tokens > agent.token_budget or full):
+                await batch_q.put(batch)
+                batch, load = [], 0
+            batch.append(index)
+            load += tokens
+        if batch:
+            await batch_q.put(batch)
+        for _ in range(dispatchers):
+            await batch_q.put(DONE)
+
+    def _on_result(self, indices: List[int], response: Dict[str, Any]):
+        agent = self.agent
+        matched, unmatched, missing = match_by_id(indices, response.get("candidates", []))
+        if agent.cache is not None:
+            for index, candidate in matched.items():
+                agent.cache.put(self.hashes[index], agent.model_name, agent.fingerprint, candidate)
+        metrics.inc("candidates_returned_total", len(response.get("candidates", [])))
+        self.writer.write([matched[i] for i in sorted(matched)] + unmatched)
+        self.dead_letter.extend({"cv": self.files[i], "reason": "model returned no candidate for this CV"}
+                                for i in missing)
+
+    async def _dispatch(self, engine: AsyncExtractionEngine, semaphore: asyncio.Semaphore, batch_q: asyncio.Queue):
+        while (indices := await batch_q.get()) is not DONE:
+            self.requests += 1
+            await engine.process_batch(semaphore, indices)
+            for index in indices:
+                if index in engine.failures:
+                    self.dead_letter.append({"cv": self.files[index], "reason": engine.failures.pop(index)})
+                # The batch is done, its texts are no longer needed
+                del self.texts[index], self.files[index], self.hashes[index]
+
+    async def arun(self, path: str) -> Dict[str, Any]:
+        agent = self.agent
+        start = perf_counter()
+        agent.raw_chars = agent.sent_chars = 0
+        readers = (agent.read_workers or os.cpu_count() or 1) if agent.parallel_read else 1
+        dispatchers = max(1, agent.concurrency)
+        files_q = asyncio.Queue(self.queue_size)
+        texts_q = asyncio.Queue(self.queue_size)
+        batch_q = asyncio.Queue(dispatchers)
+        engine = AsyncExtractionEngine(agent.chain, lambda indices: agent.batch_prompt(self.texts, indices),
+                                       concurrency=dispatchers, rate_limiter=agent.rate_limiter,
+                                       max_retries=agent.max_retries, backoff_base=agent.backoff_base,
+                                       breaker=agent.breaker, logger=self.logger, on_result=self._on_result)
+        semaphore = asyncio.Semaphore(dispatchers)
+
+        executor = ProcessPoolExecutor(readers) if agent.parallel_read else ThreadPoolExecutor(1)
+        try:
+            with metrics.timer("streaming_pipeline"):
+                await asyncio.gather(
+                    self._discover(path, files_q, readers),
+                    *[self._read(executor, files_q, texts_q) for _ in range(readers)],
+                    self._batch(texts_q, batch_q, readers, dispatchers),
+                    *[self._dispatch(engine, semaphore, batch_q) for _ in range(dispatchers)],
+                )
+        finally:
+            executor.shutdown()
+            if agent.cache is not None:
+                agent.cache.touch()
+            self.writer.close()
+            if self.summary is not None:
+                self.summary.save(agent.summary_path)
+
+        if self.dead_letter:
+            write_dead_letter(agent.dead_letter_path, self.dead_letter)
+            self.logger.warning(f"{len(self.dead_letter)} CVs could not be extracted, see {agent.dead_letter_path}")
+        agent.log_compaction()
+        elapsed = perf_counter() - start
+        stats = {
+            "cvs": self.cvs + self.cache_hits,
+            "rows": self.writer.rows,
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "failed": len(self.dead_letter),
+            "seconds": elapsed,
+            "first_row_seconds": self.writer.first_row_at - start if self.writer.first_row_at else None,
+        }
+        self.logger.info(f"Streamed {stats['rows']} rows to {self.writer.output_path} in {elapsed:.2f}s "
+                         f"(first row after {stats['first_row_seconds'] or 0:.2f}s)")
+        return stats
+
+    def run(self, path: str) -> Dict[str, Any]:
+        return asyncio.run(self.arun(path))
@@ -0,0 +1,263 @@
+import ast
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.metrics import metrics
+
+MAX_LABEL_LENGTH = 25
+TOP_K = 80
+MAX_UNIT_BINS = 200  # wider numeric ranges (e.g. a hallucinated age of 2019) chart only the values present
+DENSE_PAIRS = 1 << 22  # (segment, value) pairs counted in a dense table rather than by sorting
+
+
+class ColumnStats:
+    """Distribution of one report column, labels and counts already in chart order.
+
+    kind is "histogram" for numeric and categorical columns (unit-wide bins or
+    categories in order of first appearance) and "list" for list columns such
+    as skills (items truncated to max_label_length, top_k most frequent).
+    """
+
+    def __init__(self, column: str, kind: str, labels: List[Any], counts: List[int], error: Optional[str] = None):
+        self.column = column
+        self.kind = kind
+        self.labels = labels
+        self.counts = counts
+        self.error = error
+
+    def __repr__(self):
+        return f"ColumnStats({self.column!r}, {self.kind!r}, {len(self.labels)} labels)"
+
+
+def is_list_column(series: pd.Series) -> bool:
+    """List columns hold Python lists, or their string form when read back from CSV."""
+    if pd.api.types.is_numeric_dtype(series):
+        return False
+    values = series.dropna()
+    if values.empty:
+        return False
+    last = values.iloc[-1]
+    return not isinstance(last, str) or last.startswith("[")
+
+
+def unit_bins(edges: np.ndarray, counts: np.ndarray) -> Tuple[List[int], List[int]]:
+    """Chart bins of sorted distinct integer edges and their counts.
+
+    Every unit bin from the lowest to the highest edge, empty ones included,
+    unless that spans more than MAX_UNIT_BINS; then only the edges present.
+    """
+    if not len(edges):
+        return [], []
+    low, high = int(edges[0]), int(edges[-1])
+    if high - low >= MAX_UNIT_BINS:
+        return edges.tolist(), counts.tolist()
+    dense = np.zeros(high - low + 1, dtype=np.int64)
+    dense[edges - low] = counts
+    return list(range(low, high + 1)), dense.tolist()
+
+
+def numeric_bins(values: np.ndarray) -> Tuple[List[int], List[int]]:
+    """unit_bins of numeric values; counted over distinct values, so outliers cost no memory."""
+    edges, counts = np.unique(np.floor(values.astype(float)).astype(np.int64), return_counts=True)
+    return unit_bins(edges, counts)
+
+
+def histogram_stats(series: pd.Series) -> ColumnStats:
+    values = series.dropna()
+    if values.empty:
+        return ColumnStats(series.name, "histogram", [], [])
+    if pd.api.types.is_numeric_dtype(values):
+        return ColumnStats(series.name, "histogram", *numeric_bins(values.to_numpy(dtype=float)))
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(str)
+    codes, uniques = pd.factorize(values)
+    return ColumnStats(series.name, "histogram", list(uniques), np.bincount(codes).tolist())
+
+
+def list_items(series: pd.Series) -> pd.Series:
+    """Every item of a list column, one row per item, indexed by the row it came from.
+
+    Strings such as "['Python', 'SQL']" are split with vectorized string
+    operations; only rows the split cannot read exactly (quotes or escapes
+    inside items, empty lists) go through ast.literal_eval.
+    """
+    values = series.dropna()
+    if values.empty or not isinstance(values.iloc[0], str):
+        return values.explode().dropna()
+    simple = (values.str.startswith("['") & values.str.endswith("']")
+              & ~values.str.contains('"', regex=False) & ~values.str.contains("\\", regex=False))
+    items = values[simple].str.slice(2, -2).str.split("', '").explode()
+    rest = values[~simple & (values != "[]")]
+    if not rest.empty:
+        parsed = pd.Series([ast.literal_eval(value) for value in rest], index=rest.index, dtype=object)
+        items = pd.concat([items, parsed.explode().dropna()]).sort_index(kind="stable")
+    return items
+
+
+def list_stats(series: pd.Series, max_label_length: int = MAX_LABEL_LENGTH, top_k: int = TOP_K) -> ColumnStats:
+    try:
+        items = list_items(series)
+    except (ValueError, SyntaxError) as e:
+        return ColumnStats(series.name, "list", [], [], error=str(e))
+    if items.empty:
+        return ColumnStats(series.name, "list", [], [])
+    codes, uniques = pd.factorize(items.astype(str).str.slice(0, max_label_length))
+    counts = np.bincount(codes)
+    # Stable sort keeps ties in order of first appearance
+    order = np.argsort(-counts, kind="stable")[:top_k]
+    return ColumnStats(series.name, "list", list(uniques[order]), counts[order].tolist())
+
+
+@metrics.timed("report_stats")
+def column_stats(df: pd.DataFrame, max_label_length: int = MAX_LABEL_LENGTH, top_k: int = TOP_K) -> Dict[str, ColumnStats]:
+    """Every column's chart data, computed once per dataset."""
+    return {
+        column: list_stats(df[column], max_label_length, top_k) if is_list_column(df[column])
+        else histogram_stats(df[column])
+        for column in df.columns
+    }
+
+
+def _segment_counts(groups: np.ndarray, codes: np.ndarray, n_codes: int, n_groups: int):
+    """Per segment: (codes present, their counts, position of their first row), from distinct pairs only."""
+    pairs = groups.astype(np.int64) * n_codes + codes
+    if n_groups * n_codes <= DENSE_PAIRS:
+        # Few enough pairs for a dense table: no sort needed
+        counts = np.bincount(pairs, minlength=n_groups * n_codes)
+        # Earliest row of each pair; fancy assignment with repeated indices has no defined winner
+        first = np.full(n_groups * n_codes, len(pairs), dtype=np.int64)
+        np.minimum.at(first, pairs, np.arange(len(pairs)))
+        unique_pairs = np.flatnonzero(counts)
+        counts, first_rows = counts[unique_pairs], first[unique_pairs]
+    else:
+        unique_pairs, first_rows, counts = np.unique(pairs, return_index=True, return_counts=True)
+    bounds = np.searchsorted(unique_pairs, np.arange(n_groups + 1, dtype=np.int64) * n_codes)
+    return [(unique_pairs[bounds[g]:bounds[g + 1]] - g * n_codes, counts[bounds[g]:bounds[g + 1]],
+             first_rows[bounds[g]:bounds[g + 1]]) for g in range(n_groups)]
+
+
+def _prepare(series: pd.Series, max_label_length: int) -> Tuple[str, np.ndarray, Any, np.ndarray]:
+    """A column parsed and encoded once: (kind, codes or bins, uniques, row of each code).
+
+    Raises ValueError or SyntaxError for list columns that cannot be parsed.
+    """
+    series = series.reset_index(drop=True)
+    if is_list_column(series):
+        items = list_items(series)
+        codes, uniques = pd.factorize(items.astype(str).str.slice(0, max_label_length))
+        return "list", codes, uniques, items.index.to_numpy()
+    values = series.dropna()
+    if pd.api.types.is_numeric_dtype(values):
+        return "numeric", np.floor(values.to_numpy(dtype=float)).astype(np.int64), None, values.index.to_numpy()
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(str)
+    codes, uniques = pd.factorize(values)
+    return "category", codes, uniques, values.index.to_numpy()
+
+
+def _group_stats(column: str, prepared, groups: np.ndarray, n_groups: int, top_k: int) -> List[ColumnStats]:
+    """ColumnStats of a prepared column for each group; groups holds each row's group, -1 for none."""
+    kind, codes, uniques, rows = prepared
+    code_groups = groups[rows]
+    keep = code_groups >= 0
+    codes, code_groups = codes[keep], code_groups[keep]
+    if kind == "numeric":
+        by_group = np.argsort(code_groups, kind="stable")
+        bounds = np.searchsorted(code_groups[by_group], np.arange(n_groups + 1))
+        result = []
+        for g in range(n_groups):
+            bins = codes[by_group[bounds[g]:bounds[g + 1]]]
+            result.append(ColumnStats(column, "histogram", *numeric_bins(bins)))
+        return result
+    result = []
+    for present, counts, first in _segment_counts(code_groups, codes, len(uniques), n_groups):
+        if kind == "list":
+            # Most frequent first, ties in order of first appearance within the group
+            order = np.lexsort((first, -counts))[:top_k]
+            result.append(ColumnStats(column, "list", list(uniques[present[order]]), counts[order].tolist()))
+        else:
+            order = np.argsort(first, kind="stable")
+            result.append(ColumnStats(column, "histogram", list(uniques[present[order]]), counts[order].tolist()))
+    return result
+
+
+@metrics.timed("report_stats")
+def grouped_column_stats(df: pd.DataFrame, key: str, max_label_length: int = MAX_LABEL_LENGTH, top_k: int = TOP_K
+                         ) -> Tuple[Dict[str, ColumnStats], Dict[Any, Dict[str, ColumnStats]]]:
+    """column_stats of the whole frame and of every segment of df grouped by key, sharing one parse.
+
+    Each column is parsed and factorized once, then counted for all rows
+    and per segment with one pass over distinct (segment, value) pairs,
+    so the skills column is not parsed again for every report. Segments
+    come in order of first appearance and leave out the key column, which
+    has a single value in each; both results equal column_stats.
+    """
+    group_codes, segments = pd.factorize(df[key])
+    everyone = np.zeros(len(df), dtype=np.int64)
+    total: Dict[str, ColumnStats] = {}
+    by_segment: Dict[Any, Dict[str, ColumnStats]] = {segment: {} for segment in segments}
+    for column in df.columns:
+        try:
+            prepared = _prepare(df[column], max_label_length)
+        except (ValueError, SyntaxError) as e:
+            total[column] = ColumnStats(column, "list", [], [], error=str(e))
+            for segment in segments:
+                by_segment[segment][column] = total[column]
+            continue
+        total[column] = _group_stats(column, prepared, everyone, 1, top_k)[0]
+        if column == key:
+            continue
+        for segment, column_stat in zip(segments, _group_stats(column, prepared, group_codes, len(segments), top_k)):
+            by_segment[segment][column] = column_stat
+    return total, by_segment
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import random
+    from time import perf_counter
+
+    from src.fake_llm import COLLEGES, DEGREES, DEPARTMENTS, GENDERS, SKILLS, UNIVERSITIES
+
+    def loop_skill_counts(df):
+        """The per-row loop create_survey_report used before column_stats."""
+        skills_counts = {}
+        for skills in df["skills"]:
+            for skill in ast.literal_eval(skills):
+                if len(skill) > 25:
+                    skill = skill[:25]
+                skills_counts[skill] = skills_counts.get(skill, 0) + 1
+        sorted_skills = sorted(list(skills_counts.items()), key=lambda x: x[1], reverse=True)
+        return [i[0] for i in sorted_skills][:80], [i[1] for i in sorted_skills][:80]
+
+    parser = argparse.ArgumentParser(description="Benchmark report statistics against the per-row loop")
+    parser.add_argument("--rows", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--skip_loop", action="store_true", help="Only time column_stats")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    results = []
+    for rows in args.rows:
+        df = pd.DataFrame({
+            "university": [rng.choice(UNIVERSITIES) for _ in range(rows)],
+            "age": [rng.randint(21, 45) for _ in range(rows)],
+            "college": [rng.choice(COLLEGES) for _ in range(rows)],
+            "gender": [rng.choice(GENDERS) for _ in range(rows)],
+            "experience": [rng.randint(0, 15) for _ in range(rows)],
+            "department": [rng.choice(DEPARTMENTS) for _ in range(rows)],
+            "degrees": [rng.choice(DEGREES) for _ in range(rows)],
+            "skills": [str(rng.sample(SKILLS, rng.randint(3, 8))) for _ in range(rows)],
+        })
+        start = perf_counter()
+        stats = column_stats(df)
+        result = {"rows": rows, "column_stats_seconds": round(perf_counter() - start, 3)}
+        if not args.skip_loop:
+            start = perf_counter()
+            labels, counts = loop_skill_counts(df)
+            result["loop_seconds"] = round(perf_counter() - start, 3)
+            result["same_skills"] = labels == stats["skills"].labels and counts == stats["skills"].counts
+        results.append(result)
+        print(json.dumps(result))
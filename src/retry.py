@@ -0,0 +1,74 @@
+import asyncio
+import json
+import logging
+import random
+import re
+from time import monotonic
+from typing import Any, Dict, List
+
+from src.metrics import metrics
+
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+TRANSIENT_MARKERS = ("resource exhausted", "resourceexhausted", "quota", "rate limit",
+                     "unavailable", "deadline exceeded", "internal error", "timeout")
+TRANSIENT_CODES = re.compile(r"\b(429|50[0234])\b")
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter for the given (1-based) attempt."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def is_transient(error: Exception) -> bool:
+    """True for rate limit (429) and server side (5xx) errors worth retrying as is."""
+    for attr in ("status_code", "code", "status"):
+        status = getattr(error, attr, None)
+        if isinstance(status, int):
+            return status in TRANSIENT_STATUS
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in TRANSIENT_MARKERS) or bool(TRANSIENT_CODES.search(message))
+
+
+class CircuitBreaker:
+    """Pauses dispatch after `threshold` consecutive transient failures.
+
+    While open, `wait()` holds every caller until `cooldown` seconds have
+    passed; the next success closes the breaker again.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.logger = logging.getLogger(__name__)
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold and self.opened_at is None:
+            self.opened_at = monotonic()
+            metrics.inc("circuit_breaker_opened_total")
+            self.logger.warning(f"Circuit breaker open after {self.failures} consecutive errors, "
+                                f"pausing dispatch for {self.cooldown:.0f} seconds")
+
+    async def wait(self):
+        if self.opened_at is None:
+            return
+        remaining = self.opened_at + self.cooldown - monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        # Half-open: let requests through, one more failure re-opens it
+        if self.opened_at is not None and monotonic() >= self.opened_at + self.cooldown:
+            self.opened_at = None
+            self.failures = self.threshold - 1
+
+
+def write_dead_letter(path: str, entries: List[Dict[str, Any]]):
+    """Write one JSON line per CV that could not be extracted."""
+    with open(path, "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
@@ -0,0 +1,83 @@
+import math
+from typing import Sequence, Tuple
+
+from reportlab.graphics.charts.barcharts import HorizontalBarChart, VerticalBarChart
+from reportlab.graphics.shapes import Drawing, Group, String
+from reportlab.lib import colors
+
+TITLE_SIZE = 12
+LABEL_SIZE = 7
+
+
+def _value_step(max_count: int) -> int:
+    return max(1, math.ceil(max_count / 10))
+
+
+def _titles(drawing: Drawing, title: str, xaxis_title: str, yaxis_title: str):
+    width, height = drawing.width, drawing.height
+    drawing.add(String(width / 2, height - TITLE_SIZE - 4, title, fontName="Helvetica-Bold",
+                       fontSize=TITLE_SIZE, textAnchor="middle"))
+    drawing.add(String(width / 2, 4, xaxis_title, fontName="Helvetica", fontSize=LABEL_SIZE + 2, textAnchor="middle"))
+    y_title = String(0, 0, yaxis_title, fontName="Helvetica", fontSize=LABEL_SIZE + 2, textAnchor="middle")
+    group = Group(y_title)
+    group.rotate(90)
+    group.translate(height / 2, -10)
+    drawing.add(group)
+
+
+def histogram_drawing(labels: Sequence, counts: Sequence[int], title: str, xaxis_title: str, yaxis_title: str,
+                      width: float, height: float) -> Drawing:
+    """Vertical bar histogram of precomputed bin counts, matching the plotly one of create_survey_report."""
+    labels = [str(label) for label in labels]
+    drawing = Drawing(width, height)
+    chart = VerticalBarChart()
+    rotate = len(labels) > 12 or max((len(label) for label in labels), default=0) > 12
+    bottom = 70 if rotate else 35
+    chart.x, chart.y = 45, bottom
+    chart.width, chart.height = width - 60, height - bottom - 30
+    chart.data = [list(counts) or [0]]
+    chart.categoryAxis.categoryNames = labels or [""]
+    chart.categoryAxis.labels.fontSize = LABEL_SIZE
+    chart.categoryAxis.labels.fontName = "Helvetica"
+    if rotate:
+        chart.categoryAxis.labels.angle = 45
+        chart.categoryAxis.labels.boxAnchor = "ne"
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.valueStep = _value_step(max(counts, default=0))
+    chart.valueAxis.labels.fontSize = LABEL_SIZE
+    chart.valueAxis.labels.fontName = "Helvetica"
+    # Thin bars, like bargap=.9 in the plotly version
+    chart.barWidth = 1
+    chart.groupSpacing = 4
+    chart.bars[0].fillColor = colors.Color(0, 0, 1, alpha=0.7)
+    chart.bars[0].strokeColor = None
+    drawing.add(chart)
+    _titles(drawing, title, xaxis_title, yaxis_title)
+    return drawing
+
+
+def hbar_drawing(labels: Sequence[str], counts: Sequence[int], bar_colors: Sequence[Tuple[int, int, int]],
+                 title: str, xaxis_title: str, yaxis_title: str, width: float, height: float) -> Drawing:
+    """Horizontal bar chart (one colour per bar) matching the plotly skills chart."""
+    drawing = Drawing(width, height)
+    chart = HorizontalBarChart()
+    label_size = max(4, min(LABEL_SIZE, int((height - 80) / max(len(labels), 1) * 0.8)))
+    left = 20 + max((len(label) for label in labels), default=0) * label_size * 0.5
+    chart.x, chart.y = left, 35
+    chart.width, chart.height = width - left - 15, height - 70
+    chart.data = [list(counts) or [0]]
+    chart.categoryAxis.categoryNames = list(labels) or [""]
+    chart.categoryAxis.labels.fontSize = label_size
+    chart.categoryAxis.labels.fontName = "Helvetica"
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.valueStep = _value_step(max(counts, default=0))
+    chart.valueAxis.labels.fontSize = LABEL_SIZE
+    chart.valueAxis.labels.fontName = "Helvetica"
+    chart.barWidth = 45
+    chart.groupSpacing = 55
+    chart.bars.strokeColor = None
+    for i, (r, g, b) in enumerate(bar_colors):
+        chart.bars[(0, i)].fillColor = colors.Color(r / 255, g / 255, b / 255)
+    drawing.add(chart)
+    _titles(drawing, title, xaxis_title, yaxis_title)
+    return drawing
@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from src.metrics import metrics
+from src.report_stats import grouped_column_stats
+
+logger = logging.getLogger(__name__)
+
+
+def segment_slug(value: Any) -> str:
+    """File-name-safe form of a segment value."""
+    return re.sub(r"[^0-9A-Za-z]+", "_", str(value)).strip("_").lower() or "segment"
+
+
+def build_report(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Build one report from precomputed stats; module level so it can run in a worker process."""
+    from src.pdf_build import create_survey_report
+
+    start = perf_counter()
+    create_survey_report(None, task["output"], stats=task["stats"], title=task["title"], **task["options"])
+    return {"segment": task["segment"], "rows": task["rows"], "file": task["output"],
+            "seconds": round(perf_counter() - start, 3)}
+
+
+@metrics.timed("segment_reports")
+def create_segment_reports(df: pd.DataFrame, key: str, output_dir: str = "./segment_reports",
+                           total_output: Optional[str] = None, workers: Optional[int] = None,
+                           **options) -> List[Dict[str, Any]]:
+    """One survey report per value of df[key], plus the report of all rows, built in a process pool.
+
+    Statistics of every report come from a single grouped_column_stats
+    pass, so workers only receive chart data, never candidate rows.
+    total_output is the path of the all-rows report (output_dir/all.pdf
+    by default); options go to create_survey_report (chart_backend,
+    chart_format, render_workers, figure_cache). An index of the reports
+    is written to output_dir as index.json and index.pdf and returned.
+    """
+    if key not in df.columns:
+        raise ValueError(f"Cannot segment by {key!r}, the columns are {list(df.columns)}")
+    os.makedirs(output_dir, exist_ok=True)
+    total, by_segment = grouped_column_stats(df, key)
+    rows = df[key].value_counts(sort=False)
+
+    tasks = [{"segment": None, "rows": len(df), "stats": total, "title": "Survey Analysis Report",
+              "output": total_output or os.path.join(output_dir, "all.pdf"), "options": options}]
+    used = set()
+    for segment, stats in by_segment.items():
+        slug = segment_slug(segment)
+        while slug in used:
+            slug += "_"
+        used.add(slug)
+        tasks.append({"segment": segment, "rows": int(rows[segment]), "stats": stats,
+                      "title": f"Survey Analysis Report: {segment}",
+                      "output": os.path.join(output_dir, f"{key}_{slug}.pdf"), "options": options})
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    logger.info(f"Building {len(tasks)} reports by {key} with {workers} workers")
+    if workers == 1:
+        index = [build_report(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            index = list(executor.map(build_report, tasks))
+    write_index(index, key, output_dir)
+    return index
+
+
+def write_index(index: List[Dict[str, Any]], key: str, output_dir: str):
+    """index.json and a one-table index.pdf listing every report built."""
+    from src.pdf_build import NotionDataPDF
+
+    with open(os.path.join(output_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump({"key": key, "reports": index}, f, indent=2, ensure_ascii=False, default=str)
+    table = pd.DataFrame([{key: "All candidates" if entry["segment"] is None else entry["segment"],
+                           "Candidates": entry["rows"], "Report": os.path.basename(entry["file"])}
+                          for entry in index])
+    pdf = NotionDataPDF(os.path.join(output_dir, "index.pdf"), f"Survey reports by {key}", chart_backend="reportlab")
+    pdf.add_heading(f"Survey reports by {key}", 1)
+    pdf.add_table_from_dataframe(table, max_rows=len(table))
+    pdf.build()
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import tempfile
+
+    from src.fake_llm import COLLEGES, DEGREES, DEPARTMENTS, GENDERS, SKILLS, UNIVERSITIES
+    from src.pdf_build import create_survey_report
+
+    parser = argparse.ArgumentParser(description="Time segment reports built in a pool against one by one")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--key", default="department")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chart_backend", choices=["plotly", "reportlab"], default="reportlab")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    rng = random.Random(0)
+    df = pd.DataFrame({
+        "university": [rng.choice(UNIVERSITIES) for _ in range(args.rows)],
+        "age": [rng.randint(21, 45) for _ in range(args.rows)],
+        "college": [rng.choice(COLLEGES) for _ in range(args.rows)],
+        "gender": [rng.choice(GENDERS) for _ in range(args.rows)],
+        "experience": [rng.randint(0, 15) for _ in range(args.rows)],
+        "department": [rng.choice(DEPARTMENTS) for _ in range(args.rows)],
+        "degrees": [rng.choice(DEGREES) for _ in range(args.rows)],
+        "skills": [str(rng.sample(SKILLS, rng.randint(3, 8))) for _ in range(args.rows)],
+    })
+    options = {"chart_backend": args.chart_backend}
+    with tempfile.TemporaryDirectory() as tmp:
+        # What it took before: one create_survey_report per filtered frame, in series
+        start = perf_counter()
+        create_survey_report(df, os.path.join(tmp, "all.pdf"), **options)
+        for segment in df[args.key].dropna().unique():
+            create_survey_report(df[df[args.key] == segment], os.path.join(tmp, f"{segment_slug(segment)}.pdf"),
+                                 **options)
+        sequential = perf_counter() - start
+        result = {"rows": args.rows, "key": args.key, "reports": df[args.key].nunique() + 1,
+                  "sequential_seconds": round(sequential, 2)}
+        for workers in sorted({1, args.workers}):
+            start = perf_counter()
+            create_segment_reports(df, args.key, os.path.join(tmp, f"batch_{workers}"), workers=workers, **options)
+            result[f"batch_{workers}_workers_seconds"] = round(perf_counter() - start, 2)
+        print(json.dumps(result))
@@ -0,0 +1,596 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter, time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.async_engine import AsyncExtractionEngine
+from src.batching import match_by_id, tag_cv
+from src.cache import ExtractionCache, file_hash
+from src.metrics import metrics
+from src.rate_limit import estimate_tokens
+
+JOB_PATH = re.compile(r"^/jobs/([0-9a-f]+)$")
+BATCH_PATH = re.compile(r"^/batches/([0-9a-f]+)(/events)?$")
+
+
+class QueueFull(Exception):
+    """Raised when a submission would take the service over max_queue CVs in progress."""
+
+
+class Job:
+    """One submitted CV and, once extracted, its candidate."""
+
+    def __init__(self, job_id: str, batch_id: str, filename: str, path: str):
+        self.id = job_id
+        self.batch_id = batch_id
+        self.filename = filename
+        self.path = path
+        self.state = "queued"
+        self.candidate: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.pdf_hash: Optional[str] = None
+        self.submitted_at = time()
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        seconds = round(self.finished_at - self.submitted_at, 3) if self.finished_at else None
+        return {"job": self.id, "batch": self.batch_id, "file": self.filename, "state": self.state,
+                "candidate": self.candidate, "error": self.error, "seconds": seconds}
+
+
+class ExtractionService:
+    """Long-running extraction around one warm ExtractAgent.
+
+    Submitted PDFs are spooled to disk and read in a thread pool, then wait
+    for the batcher, which packs whatever has arrived within batch_wait
+    seconds (up to the agent's token budget and max_batch_cvs) into one LLM
+    request, so concurrent small submissions share requests. Batches go
+    through the agent's AsyncExtractionEngine (retries, bisection, circuit
+    breaker, rate limits) on an event loop running in its own thread.
+    Submissions that would take more than max_queue CVs in progress are
+    refused with QueueFull. Finished jobs are kept, oldest evicted first,
+    up to max_jobs.
+    """
+
+    def __init__(self, agent, max_queue: int = 256, batch_wait: float = 0.2, read_workers: int = 2,
+                 max_jobs: int = 100_000, spool_dir: Optional[str] = None, report_options: Optional[Dict] = None):
+        self.agent = agent
+        self.logger = agent.logger
+        self.max_queue = max_queue
+        self.batch_wait = batch_wait
+        self.max_jobs = max_jobs
+        self.spool_dir = spool_dir or tempfile.mkdtemp(prefix="cv_service_")
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.report_options = report_options or {}
+
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.batches: Dict[str, List[str]] = {}
+        self.in_progress = 0
+        self.changed = threading.Condition()
+        self.report_lock = threading.Lock()
+
+        # Index of a CV in the current prompts -> its job; texts are dropped once the batch returns
+        self.texts: Dict[int, str] = {}
+        self.job_of: Dict[int, Job] = {}
+        self.next_index = 0
+
+        self.readers = ThreadPoolExecutor(read_workers, thread_name_prefix="cv-reader")
+        self.loop = asyncio.new_event_loop()
+        self.ready: Optional[asyncio.Queue] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.engine = AsyncExtractionEngine(agent.chain, lambda indices: agent.batch_prompt(self.texts, indices),
+                                            concurrency=max(1, agent.concurrency), rate_limiter=agent.rate_limiter,
+                                            max_retries=agent.max_retries, backoff_base=agent.backoff_base,
+                                            breaker=agent.breaker, logger=self.logger, on_result=self._on_result)
+        self.thread = threading.Thread(target=self._run_loop, name="cv-service-loop", daemon=True)
+
+    # Event loop side
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        if self.agent.cache is not None:
+            # SQLite connections stay in the thread that opened them, this one is the loop's
+            self.agent.cache = ExtractionCache(self.agent.cache.path, self.agent.cache.max_entries)
+        self.ready = asyncio.Queue()
+        self.semaphore = asyncio.Semaphore(max(1, self.agent.concurrency))
+        self.loop.create_task(self._batcher())
+        self.loop.run_forever()
+
+    def start(self):
+        self.thread.start()
+        while self.ready is None:
+            threading.Event().wait(0.01)
+
+    async def _cancel_tasks(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.agent.cache is not None:
+            self.agent.cache.touch()
+
+    def stop(self):
+        """Cancel the batcher and any request in flight, then end the loop thread."""
+        asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.readers.shutdown()
+
+    async def _read(self, job: Job):
+        try:
+            text = await self._read_text(job)
+        except Exception as e:
+            self.logger.exception(f"Reading {job.filename} failed")
+            self._finish(job, error=f"{type(e).__name__}: {e}")
+            return
+        finally:
+            os.remove(job.path)
+        if text is None:
+            return
+        index = self.next_index
+        self.next_index += 1
+        self.texts[index], self.job_of[index] = text, job
+        job.state = "waiting"
+        await self.ready.put(index)
+
+    async def _read_text(self, job: Job) -> Optional[str]:
+        """The CV text to extract, or None once the job is finished from the cache or by a read error."""
+        from src.init_agent import read_pdf_text
+
+        agent = self.agent
+        job.state = "reading"
+        loop = asyncio.get_running_loop()
+        if agent.cache is not None:
+            job.pdf_hash = await loop.run_in_executor(self.readers, file_hash, job.path)
+            cached = agent.cache.get(job.pdf_hash, agent.model_name, agent.fingerprint)
+            if cached is not None:
+                metrics.inc("service_cache_hits_total")
+                self._finish(job, candidate=cached)
+                return None
+        _, text, error, pages, raw_chars = await loop.run_in_executor(
+            self.readers, read_pdf_text, job.path, agent.compaction)
+        metrics.inc("pdf_files_read_total")
+        metrics.inc("pages_parsed_total", pages)
+        agent.count_chars(raw_chars, text, error)
+        if error:
+            metrics.inc("pdf_read_errors_total")
+            self._finish(job, error=f"could not read PDF: {error}")
+            return None
+        return text
+
+    async def _batcher(self):
+        """Coalesce CVs arriving within batch_wait of each other into requests."""
+        agent = self.agent
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.ready.get()]
+            load = estimate_tokens(tag_cv(batch[0], self.texts[batch[0]]))
+            deadline = loop.time() + self.batch_wait
+            while agent.max_batch_cvs is None or len(batch) < agent.max_batch_cvs:
+                try:
+                    index = await asyncio.wait_for(self.ready.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+                tokens = estimate_tokens(tag_cv(index, self.texts[index]))
+                if load + tokens > agent.token_budget:
+                    self.loop.create_task(self._dispatch(batch))
+                    batch, load = [], 0
+                batch.append(index)
+                load += tokens
+            self.loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, indices: List[int]):
+        metrics.inc("service_batches_total")
+        metrics.inc("service_batched_cvs_total", len(indices))
+        jobs = {index: self.job_of[index] for index in indices}
+        for job in jobs.values():
+            job.state = "extracting"
+        try:
+            await self.engine.process_batch(self.semaphore, indices)
+            for index, job in jobs.items():
+                if index in self.engine.failures:
+                    self._finish(job, error=self.engine.failures.pop(index))
+                elif job.state != "done":
+                    self._finish(job, error="model returned no candidate for this CV")
+        except Exception as e:
+            # Nothing awaits this task, so whatever goes wrong must end up on the jobs
+            self.logger.exception(f"Batch of {len(indices)} CVs failed")
+            for job in jobs.values():
+                self._finish(job, error=f"{type(e).__name__}: {e}")
+        finally:
+            for index in indices:
+                self.job_of.pop(index, None)
+                self.texts.pop(index, None)
+                self.engine.failures.pop(index, None)
+
+    def _on_result(self, indices: List[int], response: Dict[str, Any]):
+        matched, _, _ = match_by_id(indices, response.get("candidates", []))
+        metrics.inc("candidates_returned_total", len(response.get("candidates", [])))
+        for index, candidate in matched.items():
+            job = self.job_of[index]
+            if self.agent.cache is not None and job.pdf_hash:
+                self.agent.cache.put(job.pdf_hash, self.agent.model_name, self.agent.fingerprint, candidate)
+            self._finish(job, candidate=candidate)
+
+    def _finish(self, job: Job, candidate: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        with self.changed:
+            if job.finished_at:
+                return
+            job.candidate, job.error = candidate, error
+            job.state = "done" if error is None else "failed"
+            job.finished_at = time()
+            self.in_progress -= 1
+            metrics.inc("service_cvs_done_total" if error is None else "service_cvs_failed_total")
+            metrics.observe("service_cv_seconds", job.finished_at - job.submitted_at)
+            self.changed.notify_all()
+
+    # Caller side (HTTP threads)
+
+    def submit(self, files: List[Tuple[str, bytes]]) -> Dict[str, Any]:
+        """Queue (filename, PDF bytes) pairs as one batch of jobs; raises QueueFull when over max_queue."""
+        with self.changed:
+            if self.in_progress + len(files) > self.max_queue:
+                metrics.inc("service_rejected_total", len(files))
+                raise QueueFull(f"{self.in_progress} CVs in progress, at most {self.max_queue}")
+            # Room is reserved here, the files are spooled without holding up other submitters and waiters
+            self.in_progress += len(files)
+        batch_id = uuid.uuid4().hex
+        jobs = []
+        try:
+            for filename, data in files:
+                job_id = uuid.uuid4().hex
+                path = os.path.join(self.spool_dir, f"{job_id}.pdf")
+                with open(path, "wb") as f:
+                    f.write(data)
+                jobs.append(Job(job_id, batch_id, filename, path))
+        except OSError:
+            for job in jobs:
+                os.remove(job.path)
+            with self.changed:
+                self.in_progress -= len(files)
+            raise
+        with self.changed:
+            for job in jobs:
+                self.jobs[job.id] = job
+            self.batches[batch_id] = [job.id for job in jobs]
+            self._evict()
+        metrics.inc("service_cvs_submitted_total", len(files))
+        for job in jobs:
+            asyncio.run_coroutine_threadsafe(self._read(job), self.loop)
+        return {"batch": batch_id, "jobs": [job.id for job in jobs]}
+
+    def _evict(self):
+        while len(self.jobs) > self.max_jobs:
+            oldest = next(iter(self.jobs.values()))
+            if oldest.state not in ("done", "failed"):
+                break
+            del self.jobs[oldest.id]
+            self.batches.pop(oldest.batch_id, None)
+
+    def job(self, job_id: str) -> Optional[Job]:
+        with self.changed:
+            return self.jobs.get(job_id)
+
+    def batch_jobs(self, batch_id: str) -> Optional[List[Job]]:
+        with self.changed:
+            ids = self.batches.get(batch_id)
+            if ids is None:
+                return None
+            return [self.jobs[job_id] for job_id in ids if job_id in self.jobs]
+
+    def wait(self, jobs: List[Job], timeout: Optional[float] = None) -> bool:
+        """Block until every job is finished, False on timeout."""
+        with self.changed:
+            return self.changed.wait_for(lambda: all(job.finished_at for job in jobs), timeout)
+
+    def stream(self, jobs: List[Job], timeout: float = 600.0):
+        """Yield each job as it finishes, in completion order."""
+        pending = list(jobs)
+        deadline = perf_counter() + timeout
+        while pending:
+            with self.changed:
+                self.changed.wait_for(lambda: any(job.finished_at for job in pending),
+                                      max(0.0, deadline - perf_counter()))
+                done = [job for job in pending if job.finished_at]
+                pending = [job for job in pending if not job.finished_at]
+            if not done:
+                return
+            done.sort(key=lambda job: job.finished_at)
+            yield from done
+
+    def status(self) -> Dict[str, Any]:
+        states: Dict[str, int] = {}
+        with self.changed:
+            for job in self.jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            return {"in_progress": self.in_progress, "max_queue": self.max_queue, "jobs": states}
+
+    def report(self, batch_id: Optional[str] = None) -> bytes:
+        """PDF report of the candidates extracted so far, or of one batch."""
+        import pandas as pd
+
+        from src.pdf_build import create_survey_report
+
+        if batch_id:
+            jobs = self.batch_jobs(batch_id) or []
+        else:
+            with self.changed:
+                jobs = list(self.jobs.values())
+        candidates = [job.candidate for job in jobs if job.candidate is not None]
+        if not candidates:
+            raise ValueError("No extracted candidates to report on")
+        df = pd.DataFrame(self.agent.get_data_as_dict([{"candidates": candidates}]))
+        if self.report_options.get("normalize"):
+            from src.utiles import extra_preprocessing
+            df = extra_preprocessing(df, self.report_options.get("rules"))
+        options = {key: value for key, value in self.report_options.items()
+                   if key in ("chart_format", "render_workers", "chart_backend", "figure_cache")}
+        # ReportLab documents and the kaleido session are not shared between threads
+        with self.report_lock, tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "report.pdf")
+            with metrics.timer("service_report"):
+                create_survey_report(df, output, **options)
+            with open(output, "rb") as f:
+                return f.read()
+
+    def warm_up(self):
+        """Start what the first report would otherwise pay for: plotly and the kaleido/Chromium session."""
+        if self.report_options.get("chart_backend", "plotly") != "plotly":
+            return
+        from src.chart_render import PlotlyRenderer, plotly_histogram
+
+        start = perf_counter()
+        PlotlyRenderer(self.report_options.get("chart_format", "png")).render_all(
+            [(plotly_histogram([1, 2], [1, 1], "warm up", "x", "y"), 64, 64)])
+        self.logger.info(f"Chart renderer warmed up in {perf_counter() - start:.2f}s")
+
+
+def parse_upload(content_type: str, body: bytes, name: Optional[str]) -> List[Tuple[str, bytes]]:
+    """(filename, bytes) of every PDF in a request: a raw application/pdf body or multipart/form-data parts."""
+    if content_type.startswith("multipart/"):
+        message = BytesParser(policy=policy.default).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        return [(part.get_filename() or f"upload-{i}.pdf", part.get_payload(decode=True))
+                for i, part in enumerate(message.iter_parts()) if part.get_filename() or
+                part.get_content_type() == "application/pdf"]
+    return [(name or "upload.pdf", body)]
+
+
+def make_handler(service: ExtractionService):
+    class Handler(BaseHTTPRequestHandler):
+        """HTTP API of the extraction service.
+
+        POST /cvs                 submit one PDF (application/pdf, ?name=) or several (multipart/form-data)
+        GET  /batches/<id>        state of a submission's CVs (?wait=SECONDS blocks until they are done)
+        GET  /batches/<id>/events one JSON line per CV as it finishes
+        GET  /jobs/<id>           state and candidate of one CV
+        POST /reports             PDF report of everything extracted, or of {"batch": id}
+        GET  /health, /metrics    queue state, Prometheus metrics
+        """
+
+        def log_message(self, format, *args):
+            service.logger.debug(f"{self.address_string()} {format % args}")
+
+        def _json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+            body = json.dumps(payload, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == "/health":
+                return self._json(200, service.status())
+            if url.path == "/metrics":
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                return self.wfile.write(body)
+            match = JOB_PATH.match(url.path)
+            if match:
+                job = service.job(match.group(1))
+                if job is None:
+                    return self._json(404, {"error": "unknown job"})
+                return self._json(200, job.to_dict())
+            match = BATCH_PATH.match(url.path)
+            if match:
+                jobs = service.batch_jobs(match.group(1))
+                if jobs is None:
+                    return self._json(404, {"error": "unknown batch"})
+                if match.group(2):
+                    return self._events(jobs)
+                if "wait" in query:
+                    try:
+                        wait = float(query["wait"][0])
+                    except ValueError:
+                        return self._json(400, {"error": f"wait must be a number of seconds, got {query['wait'][0]!r}"})
+                    service.wait(jobs, wait)
+                return self._json(200, {"batch": match.group(1), "jobs": [job.to_dict() for job in jobs]})
+            self._json(404, {"error": f"no route for GET {url.path}"})
+
+        def _events(self, jobs: List[Job]):
+            # Newline-delimited JSON, the connection is closed after the last CV
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for job in service.stream(jobs):
+                self.wfile.write((json.dumps(job.to_dict(), ensure_ascii=False) + "\n").encode())
+                self.wfile.flush()
+            self.close_connection = True
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path == "/cvs":
+                name = parse_qs(url.query).get("name", [None])[0]
+                try:
+                    files = parse_upload(self.headers.get("Content-Type", ""), self._body(), name)
+                except ValueError as e:
+                    return self._json(400, {"error": f"unreadable upload: {e}"})
+                if not files:
+                    return self._json(400, {"error": "no PDF in the request"})
+                try:
+                    return self._json(202, service.submit(files))
+                except QueueFull as e:
+                    return self._json(429, {"error": str(e)}, {"Retry-After": "1"})
+            if url.path == "/reports":
+                body = self._body()
+                try:
+                    request = json.loads(body) if body else {}
+                except ValueError as e:
+                    return self._json(400, {"error": f"request body is not JSON: {e}"})
+                if not isinstance(request, dict):
+                    return self._json(400, {"error": "request body must be a JSON object"})
+                try:
+                    pdf = service.report(request.get("batch"))
+                except ValueError as e:
+                    return self._json(409, {"error": str(e)})
+                self.send_response(200)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Content-Length", str(len(pdf)))
+                self.end_headers()
+                return self.wfile.write(pdf)
+            self._json(404, {"error": f"no route for POST {url.path}"})
+
+    return Handler
+
+
+def serve(service: ExtractionService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Start the service's loop and an HTTP server on a background thread; returns the server."""
+    service.start()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="cv-service-http", daemon=True).start()
+    service.logger.info(f"Extraction service listening on http://{host}:{server.server_address[1]}")
+    return server
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import shutil
+    import subprocess
+    import sys
+    import urllib.error
+    import urllib.request
+
+    from src.init_agent import ExtractAgent
+    from src.synthetic_cvs import generate_corpus
+
+    parser = argparse.ArgumentParser(description="Exercise the service with concurrent clients and the fake backend")
+    parser.add_argument("--count", type=int, default=60, help="Synthetic CVs")
+    parser.add_argument("--clients", type=int, default=6, help="Concurrent clients, each submitting in bursts")
+    parser.add_argument("--burst", type=int, default=2, help="CVs per submission")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake backend seconds per call")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, "cvs")
+        generate_corpus(corpus, args.count, min_pages=1, max_pages=3, seed=22)
+        files = sorted(glob.glob(f"{corpus}/*.pdf"))
+
+        agent = ExtractAgent(backend="fake", backend_options={"latency": args.latency}, concurrency=4,
+                             dead_letter_path=os.path.join(tmp, "dead_letter.jsonl"))
+        service = ExtractionService(agent, max_queue=args.count, spool_dir=os.path.join(tmp, "spool"),
+                                    report_options={"chart_backend": "reportlab"})
+        server = serve(service, port=0)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        def post(path: str, body: bytes, content_type: str) -> Dict[str, Any]:
+            request = urllib.request.Request(base + path, body, {"Content-Type": content_type})
+            with urllib.request.urlopen(request) as response:
+                return json.loads(response.read())
+
+        def multipart(paths: List[str]) -> Tuple[bytes, str]:
+            boundary = uuid.uuid4().hex
+            parts = []
+            for path in paths:
+                with open(path, "rb") as f:
+                    parts.append(f"--{boundary}\r\nContent-Disposition: form-data; name=\"cv\"; "
+                                 f"filename=\"{os.path.basename(path)}\"\r\nContent-Type: application/pdf\r\n\r\n"
+                                 .encode() + f.read() + b"\r\n")
+            return b"".join(parts) + f"--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+        results: Dict[str, Dict[str, Any]] = {}
+
+        def client(paths: List[str]):
+            for i in range(0, len(paths), args.burst):
+                burst = paths[i:i + args.burst]
+                if len(burst) == 1:
+                    with open(burst[0], "rb") as f:
+                        submitted = post(f"/cvs?name={os.path.basename(burst[0])}", f.read(), "application/pdf")
+                else:
+                    submitted = post("/cvs", *multipart(burst))
+                # Stream this submission's results as they finish
+                with urllib.request.urlopen(f"{base}/batches/{submitted['batch']}/events") as response:
+                    for line in response:
+                        result = json.loads(line)
+                        results[result["file"]] = result
+
+        start = perf_counter()
+        threads = [threading.Thread(target=client, args=(files[i::args.clients],)) for i in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = perf_counter() - start
+
+        # Backpressure: one submission larger than the queue is refused
+        try:
+            post("/cvs", *multipart(files[:args.count + 1] + files[:1]))
+            refused = False
+        except urllib.error.HTTPError as e:
+            refused = e.code == 429
+
+        with urllib.request.urlopen(urllib.request.Request(f"{base}/reports", b"{}", method="POST")) as response:
+            report_bytes = len(response.read())
+        with urllib.request.urlopen(f"{base}/health") as response:
+            health = json.loads(response.read())
+
+        # The same CVs through a cold CLI run, for comparison; the CLI runs as a module from the
+        # repository root, whatever the caller's directory and PYTHONPATH
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=root)
+        single = os.path.join(tmp, "single")
+        os.makedirs(single)
+        shutil.copy(files[0], single)
+        start = perf_counter()
+        subprocess.run([sys.executable, "-m", "src.main", "extract", single, "--backend", "fake", "--fake_latency",
+                        str(args.latency), "--data", os.path.join(tmp, "one.arrow"), "--journal",
+                        os.path.join(tmp, "journal.jsonl"), "--dead_letter", os.path.join(tmp, "dl.jsonl")],
+                       check=True, capture_output=True, env=env, cwd=root)
+        cold_seconds = perf_counter() - start
+
+        server.shutdown()
+        service.stop()
+        latencies = sorted(result["seconds"] for result in results.values())
+        print(json.dumps({
+            "cvs": args.count, "done": sum(result["state"] == "done" for result in results.values()),
+            "seconds": round(elapsed, 2), "llm_requests": metrics.counters.get("llm_requests_total", 0),
+            "median_cv_seconds": latencies[len(latencies) // 2], "cold_cli_seconds": round(cold_seconds, 2),
+            "oversized_submission_refused": refused, "report_bytes": report_bytes, "health": health,
+        }, indent=2))
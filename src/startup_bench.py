@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+from time import perf_counter
+from typing import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What each kind of start imports before doing any work
+SCENARIOS = {
+    # Everything the single-command main.py imported at the top
+    "eager": "import src.init_agent, src.pdf_build, src.chart_render, plotly.graph_objects, plotly.express, "
+             "plotly.io, kaleido, PIL.Image, langchain_google_genai, pandas",
+    # The CLI itself, e.g. `main.py --help`
+    "cli": "import src.main",
+    # `main.py report` with the ReportLab chart backend
+    "report": "import src.main, src.pdf_build, src.candidate_store",
+    # `main.py report` with the plotly chart backend
+    "report_plotly": "import src.main, src.pdf_build, src.candidate_store, src.chart_render, plotly.graph_objects, "
+                     "kaleido",
+    # `main.py extract`
+    "extract": "import src.main, src.init_agent",
+}
+
+
+def measure(code: str) -> Dict[str, float]:
+    """Cold-start a fresh interpreter with -X importtime and sum what it reports."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                            env=env, cwd=ROOT)
+    wall = perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    modules = 0
+    self_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, _ = line[len("import time:"):].split("|", 2)
+        modules += 1
+        self_us += int(self_time)
+    return {"wall_seconds": round(wall, 3), "import_seconds": round(self_us / 1e6, 3), "modules": modules}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare interpreter cold-start import cost per CLI stage")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario, the fastest is kept")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.scenarios:
+        runs = [measure(SCENARIOS[name]) for _ in range(args.repeat)]
+        results[name] = min(runs, key=lambda run: run["wall_seconds"])
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,360 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.metrics import metrics
+from src.report_stats import MAX_LABEL_LENGTH, TOP_K, ColumnStats, is_list_column, list_items, unit_bins
+
+SKETCH_CAPACITY = 1000
+
+
+class ValueCounter:
+    """Exact counts of a low-cardinality column, keys in order of first appearance."""
+
+    kind = "counter"
+
+    def __init__(self, counts: Optional[Dict[str, int]] = None):
+        self.counts: Dict[str, int] = dict(counts or {})
+
+    def update(self, series: pd.Series):
+        values = series.dropna()
+        if values.empty:
+            return
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(str)
+        codes, uniques = pd.factorize(values)
+        for value, count in zip(uniques, np.bincount(codes).tolist()):
+            self.counts[str(value)] = self.counts.get(str(value), 0) + count
+
+    def merge(self, other: "ValueCounter"):
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+
+    def column_stats(self, column: str) -> ColumnStats:
+        return ColumnStats(column, "histogram", list(self.counts), list(self.counts.values()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "counts": self.counts}
+
+
+class Histogram:
+    """Exact unit-wide bins of a numeric column such as age or experience."""
+
+    kind = "histogram"
+
+    def __init__(self, bins: Optional[Dict[int, int]] = None):
+        self.bins: Dict[int, int] = {int(edge): count for edge, count in (bins or {}).items()}
+
+    def update(self, series: pd.Series):
+        values = pd.to_numeric(series, errors="coerce").dropna()
+        if values.empty:
+            return
+        edges, counts = np.unique(np.floor(values.to_numpy(dtype=float)).astype(np.int64), return_counts=True)
+        for edge, count in zip(edges.tolist(), counts.tolist()):
+            self.bins[edge] = self.bins.get(edge, 0) + count
+
+    def merge(self, other: "Histogram"):
+        for edge, count in other.bins.items():
+            self.bins[edge] = self.bins.get(edge, 0) + count
+
+    def column_stats(self, column: str) -> ColumnStats:
+        edges = sorted(self.bins)
+        return ColumnStats(column, "histogram", *unit_bins(np.array(edges, dtype=np.int64),
+                                                           np.array([self.bins[edge] for edge in edges], dtype=np.int64)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "bins": {str(edge): count for edge, count in sorted(self.bins.items())}}
+
+
+class HeavyHitters:
+    """Space-Saving sketch of the most frequent items of a list column such as skills.
+
+    At most capacity items are tracked. Each chunk is counted exactly and
+    merged in as a sketch of its own: items the sketch was not tracking
+    start from its smallest count (recorded as their error), then only
+    the capacity largest counts are kept. Counts are therefore never
+    underestimated and are off by at most total / capacity; while fewer
+    than capacity distinct items were seen they are exact.
+    """
+
+    kind = "heavy_hitters"
+
+    def __init__(self, capacity: int = SKETCH_CAPACITY, max_label_length: int = MAX_LABEL_LENGTH,
+                 counts: Optional[Dict[str, int]] = None, errors: Optional[Dict[str, int]] = None, total: int = 0):
+        self.capacity = capacity
+        self.max_label_length = max_label_length
+        self.counts: Dict[str, int] = dict(counts or {})
+        self.errors: Dict[str, int] = dict(errors or {})
+        self.total = total
+
+    def floor(self) -> int:
+        """Count an untracked item may have had: the smallest tracked count once the sketch is full."""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def _combine(self, counts: Dict[str, int], errors: Dict[str, int], floor: int, total: int):
+        own_floor = self.floor()
+        merged = {item: count + counts.get(item, floor) for item, count in self.counts.items()}
+        merged_errors = {item: self.errors.get(item, 0) + (errors.get(item, 0) if item in counts else floor)
+                         for item in self.counts}
+        for item, count in counts.items():
+            if item not in merged:
+                merged[item] = count + own_floor
+                merged_errors[item] = errors.get(item, 0) + own_floor
+        if len(merged) > self.capacity:
+            keep = set(sorted(merged, key=merged.get, reverse=True)[:self.capacity])
+            merged = {item: count for item, count in merged.items() if item in keep}
+        self.counts = merged
+        self.errors = {item: merged_errors[item] for item in merged if merged_errors[item]}
+        self.total += total
+
+    def update(self, series: pd.Series):
+        items = list_items(series)
+        if items.empty:
+            return
+        codes, uniques = pd.factorize(items.astype(str).str.slice(0, self.max_label_length))
+        counts = dict(zip(uniques, np.bincount(codes).tolist()))
+        self._combine(counts, {}, 0, len(items))
+
+    def merge(self, other: "HeavyHitters"):
+        self._combine(other.counts, other.errors, other.floor(), other.total)
+
+    def exact(self) -> bool:
+        return not self.errors
+
+    def column_stats(self, column: str, top_k: int = TOP_K) -> ColumnStats:
+        items = list(self.counts)
+        counts = np.array(list(self.counts.values()), dtype=np.int64)
+        # Stable sort keeps ties in order of first appearance, like column_stats
+        order = np.argsort(-counts, kind="stable")[:top_k]
+        return ColumnStats(column, "list", [items[i] for i in order], counts[order].tolist())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "capacity": self.capacity, "max_label_length": self.max_label_length,
+                "total": self.total, "counts": self.counts, "errors": self.errors}
+
+
+def _from_dict(data: Dict[str, Any]):
+    if data["kind"] == ValueCounter.kind:
+        return ValueCounter(data["counts"])
+    if data["kind"] == Histogram.kind:
+        return Histogram(data["bins"])
+    return HeavyHitters(data["capacity"], data["max_label_length"], data["counts"], data["errors"], data["total"])
+
+
+class CandidateSummary:
+    """Mergeable per-column summaries of extracted candidates, enough to draw the report.
+
+    Numeric columns get a Histogram, list columns (skills) a HeavyHitters
+    sketch and every other column an exact ValueCounter. Summaries are updated
+    one chunk of rows at a time, merged across runs and saved as small
+    JSON files, so the report never needs every row in memory.
+    """
+
+    def __init__(self, capacity: int = SKETCH_CAPACITY, max_label_length: int = MAX_LABEL_LENGTH):
+        self.capacity = capacity
+        self.max_label_length = max_label_length
+        self.rows = 0
+        self.columns: Dict[str, Any] = {}
+
+    def _summary_for(self, series: pd.Series):
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            return Histogram()
+        if is_list_column(series):
+            return HeavyHitters(self.capacity, self.max_label_length)
+        return ValueCounter()
+
+    def update(self, df: pd.DataFrame):
+        """Add a chunk of candidate rows."""
+        for column in df.columns:
+            if column not in self.columns:
+                if df[column].dropna().empty:
+                    continue
+                self.columns[column] = self._summary_for(df[column])
+            self.columns[column].update(df[column])
+        self.rows += len(df)
+
+    def merge(self, other: "CandidateSummary") -> "CandidateSummary":
+        for column, summary in other.columns.items():
+            if column not in self.columns:
+                self.columns[column] = _from_dict(summary.to_dict())
+            elif self.columns[column].kind != summary.kind:
+                raise ValueError(f"Cannot merge {column}: {self.columns[column].kind} and {summary.kind}")
+            else:
+                self.columns[column].merge(summary)
+        self.rows += other.rows
+        return self
+
+    def normalized(self, normalizer) -> "CandidateSummary":
+        """A copy with the counter columns canonicalized by a src.normalize.Normalizer."""
+        copy = CandidateSummary.from_dict(self.to_dict())
+        for field, field_normalizer in normalizer.fields.items():
+            summary = copy.columns.get(field)
+            if not isinstance(summary, ValueCounter) or not summary.counts:
+                continue
+            field_normalizer.resolve(pd.Series(list(summary.counts)), np.array(list(summary.counts.values())))
+            canonical = ValueCounter()
+            for value, count in summary.counts.items():
+                value = str(field_normalizer.mapping.get(value, value))
+                canonical.counts[value] = canonical.counts.get(value, 0) + count
+            copy.columns[field] = canonical
+        return copy
+
+    @metrics.timed("report_stats")
+    def column_stats(self, top_k: int = TOP_K) -> Dict[str, ColumnStats]:
+        """Every column's chart data, as report_stats.column_stats computes it from a DataFrame."""
+        return {column: summary.column_stats(column, top_k) if isinstance(summary, HeavyHitters)
+                else summary.column_stats(column)
+                for column, summary in self.columns.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"rows": self.rows, "capacity": self.capacity, "max_label_length": self.max_label_length,
+                "columns": {column: summary.to_dict() for column, summary in self.columns.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CandidateSummary":
+        summary = cls(data["capacity"], data["max_label_length"])
+        summary.rows = data["rows"]
+        summary.columns = {column: _from_dict(column_data) for column, column_data in data["columns"].items()}
+        return summary
+
+    def save(self, path: str):
+        # Written aside and renamed, so a reader never sees half a summary
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "CandidateSummary":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def iter_chunks(path: str, chunk_rows: int = 100_000) -> Iterator[pd.DataFrame]:
+    """A candidate file as DataFrames of about chunk_rows rows; Arrow files one record batch at a time."""
+    if os.path.splitext(path)[1] not in (".arrow", ".feather"):
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+        return
+    import pyarrow as pa
+
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            for offset in range(0, batch.num_rows, chunk_rows):
+                yield batch.slice(offset, chunk_rows).to_pandas()
+
+
+def summarize_file(path: str, chunk_rows: int = 100_000, capacity: int = SKETCH_CAPACITY) -> CandidateSummary:
+    summary = CandidateSummary(capacity)
+    for chunk in iter_chunks(path, chunk_rows):
+        summary.update(chunk)
+    return summary
+
+
+def merge_files(paths: List[str]) -> CandidateSummary:
+    summary = CandidateSummary.load(paths[0])
+    for path in paths[1:]:
+        summary.merge(CandidateSummary.load(path))
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    import itertools
+    import random
+    import tempfile
+    import tracemalloc
+    from time import perf_counter
+
+    from src.candidate_store import load_candidates, row_writer
+    from src.fake_llm import COLLEGES, DEGREES, DEPARTMENTS, GENDERS, SKILLS, UNIVERSITIES
+    from src.report_stats import column_stats
+
+    parser = argparse.ArgumentParser(description="Build, merge or benchmark candidate summaries")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Summarize a candidate file")
+    build.add_argument("data", help="Candidate file (.arrow or .csv)")
+    build.add_argument("output", help="Summary file to write")
+    build.add_argument("--capacity", type=int, default=SKETCH_CAPACITY, help="Skills tracked by the sketch")
+    merge = subparsers.add_parser("merge", help="Merge summary files, e.g. of separate runs")
+    merge.add_argument("output", help="Summary file to write")
+    merge.add_argument("inputs", nargs="+", help="Summary files to merge")
+    bench = subparsers.add_parser("bench", help="Compare memory and time with the full DataFrame")
+    bench.add_argument("--rows", nargs="+", type=int, default=[100_000, 1_000_000])
+    bench.add_argument("--chunk_rows", type=int, default=100_000)
+    bench.add_argument("--long_tail", type=int, default=5000, help="Rare skills drawn besides the common ones")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        summarize_file(args.data, capacity=args.capacity).save(args.output)
+    elif args.command == "merge":
+        merge_files(args.inputs).save(args.output)
+    else:
+        rng = random.Random(0)
+        # A Zipf-like long tail of rarer skills, as free-text skills have
+        rare = [f"Rare skill {i}" for i in range(args.long_tail)]
+        rare_weights = list(itertools.accumulate(1 / (i + 1) for i in range(args.long_tail)))
+        with tempfile.TemporaryDirectory() as tmp:
+            for rows in args.rows:
+                path = os.path.join(tmp, f"candidates_{rows}.arrow")
+
+                def to_columns(batches):
+                    columns = {}
+                    for batch in batches:
+                        for candidate in batch["candidates"]:
+                            for key, value in candidate.items():
+                                columns.setdefault(key, []).append(value)
+                    return columns
+
+                writer = row_writer(path, to_columns)
+                for start in range(0, rows, args.chunk_rows):
+                    writer.write([{
+                        "university": rng.choice(UNIVERSITIES), "age": rng.randint(21, 45),
+                        "college": rng.choice(COLLEGES), "gender": rng.choice(GENDERS),
+                        "experience": rng.randint(0, 15), "department": rng.choice(DEPARTMENTS),
+                        "degrees": rng.choice(DEGREES),
+                        "skills": rng.sample(SKILLS, rng.randint(2, 6))
+                                  + rng.choices(rare, cum_weights=rare_weights, k=rng.randint(0, 2)),
+                    } for _ in range(min(args.chunk_rows, rows - start))])
+                writer.close()
+
+                result = {"rows": rows}
+                tracemalloc.start()
+                start = perf_counter()
+                expected = column_stats(load_candidates(path))
+                result["dataframe_seconds"] = round(perf_counter() - start, 3)
+                result["dataframe_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+                tracemalloc.stop()
+
+                tracemalloc.start()
+                start = perf_counter()
+                summary = summarize_file(path, args.chunk_rows)
+                stats = summary.column_stats()
+                result["summary_seconds"] = round(perf_counter() - start, 3)
+                result["summary_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+                tracemalloc.stop()
+
+                summary_path = os.path.join(tmp, "summary.json")
+                summary.save(summary_path)
+                result["summary_bytes"] = os.path.getsize(summary_path)
+                # Two halves summarized apart and merged, as separate runs would be
+                halves = [CandidateSummary(), CandidateSummary()]
+                for i, chunk in enumerate(iter_chunks(path, args.chunk_rows)):
+                    halves[i % 2].update(chunk)
+                merged = halves[0].merge(halves[1]).column_stats()
+                result["exact_columns_equal"] = all(
+                    (stats[c].labels, stats[c].counts) == (expected[c].labels, expected[c].counts)
+                    for c in expected if c != "skills")
+                # Compared with exact counts of every skill, not just the top 80
+                exact = column_stats(load_candidates(path, ["skills"]), top_k=None)["skills"]
+                exact = dict(zip(exact.labels, exact.counts))
+                top = set(expected["skills"].labels)
+                result["skills_top80_recall"] = len(set(stats["skills"].labels) & top) / len(top)
+                result["merged_top80_recall"] = len(set(merged["skills"].labels) & top) / len(top)
+                result["skills_max_overcount"] = max(count - exact[label] for label, count in
+                                                     zip(stats["skills"].labels, stats["skills"].counts))
+                result["error_bound"] = summary.columns["skills"].total // summary.capacity
+                print(json.dumps(result))
@@ -0,0 +1,112 @@
+import os
+import random
+from typing import Any, Dict, List
+
+import fitz  # PyMuPDF
+
+from src.fake_llm import COLLEGES, DEGREES, DEPARTMENTS, GENDERS, SKILLS, UNIVERSITIES
+
+FIRST_NAMES = ["Ahmed", "Mona", "Omar", "Sara", "Youssef", "Nour", "Karim", "Laila", "Hassan", "Mariam"]
+LAST_NAMES = ["Hassan", "Ali", "Mahmoud", "Ibrahim", "Mostafa", "Adel", "Fathy", "Samir"]
+COMPANIES = ["Vodafone", "Valeo", "Instabug", "Fawry", "Swvl", "IBM", "Microsoft", "Orange"]
+WORDS = ("designed built maintained scalable services data pipelines team production models deployed "
+         "improved latency reduced cost automated testing monitoring dashboards customers requirements "
+         "collaborated analysed migrated cloud infrastructure features release reliability").split()
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+
+
+def synthetic_fields(rng: random.Random) -> Dict[str, Any]:
+    """Ground-truth CandidateInfo values of one synthetic candidate."""
+    return {
+        "university": rng.choice(UNIVERSITIES),
+        "age": rng.randint(21, 45),
+        "college": rng.choice(COLLEGES),
+        "gender": rng.choice(GENDERS),
+        "experience": rng.randint(0, 15),
+        "department": rng.choice(DEPARTMENTS),
+        "degrees": rng.choice(DEGREES),
+        "skills": rng.sample(SKILLS, rng.randint(3, 8)),
+    }
+
+
+def synthetic_pages(fields: Dict[str, Any], pages: int, rng: random.Random,
+                    date_ranges: bool = False) -> List[str]:
+    """Text of each page: profile first, then work history, references last.
+
+    Every page repeats a header and a page-number footer, like real CVs do.
+    With date_ranges the university line and the jobs carry year ranges
+    ("Cairo University, 2015 - 2019", "Valeo (2018 - 2020)", "IBM, 2019-2023")
+    instead of single years.
+    """
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    header = f"{name} - Curriculum Vitae"
+    university = fields["university"]
+    if date_ranges:
+        start = rng.randint(2005, 2018)
+        university += f", {start} - {start + 4}"
+    body = [
+        f"{name}\nEmail: {name.lower().replace(' ', '.')}@example.com\nPhone: +20 1{rng.randint(100000000, 999999999)}\n\n"
+        f"University: {university}\nCollege: {fields['college']}\nDepartment: {fields['department']}\n"
+        f"Degrees: {fields['degrees']}\nAge: {fields['age']}\nGender: {fields['gender']}\n"
+        f"Experience: {fields['experience']}\nSkills: {', '.join(fields['skills'])}\n"
+    ]
+    for _ in range(pages - 1):
+        jobs = []
+        for _ in range(3):
+            sentence = " ".join(rng.choice(WORDS) for _ in range(60))
+            year = rng.randint(2010, 2024)
+            if not date_ranges:
+                period = f" ({year})"
+            elif rng.random() < 0.5:
+                period = f" ({year} - {year + rng.randint(1, 4)})"
+            else:
+                period = f", {year}-{year + rng.randint(1, 4)}"
+            jobs.append(f"{rng.choice(COMPANIES)}{period}\n{sentence.capitalize()}.")
+        body.append("Work history\n\n" + "\n\n".join(jobs))
+    if pages > 1:
+        body[-1] += "\n\nReferences\nAvailable upon request."
+    return [f"{header}\n\n{text}\n\nPage {i + 1} of {pages}" for i, text in enumerate(body)]
+
+
+def write_pdf(file_path: str, pages: List[str]):
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_textbox(fitz.Rect(50, 50, PAGE_WIDTH - 50, PAGE_HEIGHT - 50), text, fontsize=10)
+    doc.save(file_path)
+    doc.close()
+
+
+def generate_corpus(out_dir: str, count: int = 100, min_pages: int = 1, max_pages: int = 10,
+                    seed: int = 0, date_ranges: bool = False) -> List[Dict[str, Any]]:
+    """Write `count` synthetic CV PDFs into out_dir and return their ground truth."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    truth = []
+    for i in range(count):
+        fields = synthetic_fields(rng)
+        file_path = os.path.join(out_dir, f"cv_{i:05d}.pdf")
+        write_pdf(file_path, synthetic_pages(fields, rng.randint(min_pages, max_pages), rng, date_ranges))
+        truth.append({"file": file_path, **fields})
+    return truth
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Generate synthetic CV PDFs")
+    parser.add_argument("out_dir", help="Directory to write the PDFs into")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--min_pages", type=int, default=1)
+    parser.add_argument("--max_pages", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--truth", help="Optional JSON file for the ground-truth fields")
+    args = parser.parse_args()
+
+    truth = generate_corpus(args.out_dir, args.count, args.min_pages, args.max_pages, args.seed)
+    if args.truth:
+        with open(args.truth, "w") as f:
+            json.dump(truth, f, indent=2)
+    print(f"Wrote {len(truth)} CVs to {args.out_dir}")
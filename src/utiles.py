@@ -1,8 +1,11 @@
-def extra_preprocessing(df):
-    df["University"]=df["University"].apply(lambda x:x.lower())
-    df["University"]=df["University"].apply(lambda x:"japan University" if "japan" in x else x)
-    df["Department"]=df["Department"].apply(lambda x:"AI Department" if "ai" in x.lower() else x)
-    df["Department"]=df["Department"].apply(lambda x:"AI Department" if "machine learning" in x.lower() else x)
-    df["College"]=df["College"].apply(lambda x: "Computer Science" if "Artificial Intelligence" in x else x)
-    df["College"]=df["College"].apply(lambda x: "Engineering" if "df Science" in x else x)
-    
\ No newline at end of file
+from src.normalize import Normalizer
+
+
+def extra_preprocessing(df, rules_path=None):
+    """Canonicalize university, department and college in place with the rules file (see src/normalize.py)."""
+    normalizer = Normalizer.from_file(rules_path) if rules_path else Normalizer()
+    normalized = normalizer.normalize(df)
+    for column in normalizer.fields:
+        if column in df.columns:
+            df[column] = normalized[column]
+    return df
@@ -0,0 +1,354 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+from time import sleep, time
+from typing import Any, Dict, List, Optional
+
+from src.metrics import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY,
+    files TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    token INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    output TEXT,
+    dead_letter TEXT,
+    error TEXT
+);
+"""
+
+
+def shard_summary_path(output: str) -> str:
+    return f"{os.path.splitext(output)[0]}.summary.json"
+
+
+def merge_shard_summaries(outputs: List[str]):
+    """Summary of all the shard outputs, from the summaries their workers saved."""
+    from src.summary import CandidateSummary, summarize_file
+
+    summary = CandidateSummary()
+    for output in outputs:
+        path = shard_summary_path(output)
+        summary.merge(CandidateSummary.load(path) if os.path.exists(path) else summarize_file(output))
+    return summary
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """SQLite work queue of PDF shards with leases, shared by any number of workers.
+
+    A worker claims a pending shard, or one whose lease has expired, and
+    bumps the shard's token. Only the holder of the current token can
+    complete the shard, so a worker that lost its lease (it stalled or
+    died and someone else took over) cannot publish a second output for
+    it. merge() combines the published outputs once every shard is done.
+
+    Workers on several machines can share the queue through a common
+    filesystem, as long as it supports SQLite locking and their clocks
+    roughly agree (leases are wall-clock deadlines).
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300.0, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.logger = logging.getLogger(__name__)
+        self.conn = self._connect()
+        self.conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transactions are opened explicitly with BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    @property
+    def shard_dir(self) -> str:
+        return f"{os.path.splitext(self.path)[0]}_shards"
+
+    def meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def plan(self, pdf_files: List[str], shard_size: int = 50, output_format: str = ".arrow") -> int:
+        """Write the manifest: the PDFs split into shards of shard_size files. Returns the shard count."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.conn.execute("SELECT COUNT(*) FROM shards").fetchone()[0]:
+                raise ValueError(f"{self.path} already holds a manifest; remove it to plan a new run")
+            shards = [pdf_files[i:i + shard_size] for i in range(0, len(pdf_files), shard_size)]
+            self.conn.executemany("INSERT INTO shards (id, files) VALUES (?, ?)",
+                                  [(i, json.dumps(files)) for i, files in enumerate(shards)])
+            self.conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                                  [("output_format", output_format), ("files", str(len(pdf_files)))])
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        os.makedirs(self.shard_dir, exist_ok=True)
+        self.logger.info(f"Planned {len(shards)} shards of up to {shard_size} PDFs in {self.path}")
+        return len(shards)
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Lease the next pending or expired shard, None when there is nothing left to claim."""
+        now = time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT id, files, token, attempts, worker FROM shards "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) ORDER BY id LIMIT 1",
+                (now,)).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            shard_id, files, token, attempts, previous = row
+            if attempts >= self.max_attempts:
+                # Its last holder died too, give up on it
+                self.conn.execute("UPDATE shards SET state = 'failed', worker = NULL, lease_until = NULL, "
+                                  "error = COALESCE(error, 'lease expired') WHERE id = ?", (shard_id,))
+                self.conn.execute("COMMIT")
+                self.logger.error(f"Shard {shard_id} failed after {attempts} attempts")
+                return self.claim(worker)
+            self.conn.execute("UPDATE shards SET state = 'leased', worker = ?, lease_until = ?, token = ?, "
+                              "attempts = ? WHERE id = ?",
+                              (worker, now + self.lease_seconds, token + 1, attempts + 1, shard_id))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        if previous is not None:
+            metrics.inc("shard_leases_expired_total")
+            self.logger.warning(f"Shard {shard_id}: lease of {previous} expired, taken over by {worker}")
+        return {"id": shard_id, "files": json.loads(files), "token": token + 1}
+
+    def renew(self, shard: Dict[str, Any], conn: Optional[sqlite3.Connection] = None) -> bool:
+        """Extend a lease still held; False if the shard was taken over meanwhile."""
+        cursor = (conn or self.conn).execute(
+            "UPDATE shards SET lease_until = ? WHERE id = ? AND token = ? AND state = 'leased'",
+            (time() + self.lease_seconds, shard["id"], shard["token"]))
+        return cursor.rowcount == 1
+
+    def shard_paths(self, shard: Dict[str, Any]) -> Dict[str, str]:
+        """Partial output, dead-letter and summary files of one lease of a shard."""
+        prefix = os.path.join(self.shard_dir, f"shard-{shard['id']:05d}-{shard['token']}")
+        return {"output": prefix + self.meta("output_format"), "dead_letter": prefix + ".dead_letter.jsonl",
+                "summary": shard_summary_path(prefix + self.meta("output_format"))}
+
+    def complete(self, shard: Dict[str, Any], output: str, dead_letter: str) -> bool:
+        """Publish a shard's output; refused (False) if the lease was lost to another worker."""
+        cursor = self.conn.execute(
+            "UPDATE shards SET state = 'done', output = ?, dead_letter = ?, lease_until = NULL "
+            "WHERE id = ? AND token = ? AND state = 'leased'", (output, dead_letter, shard["id"], shard["token"]))
+        return cursor.rowcount == 1
+
+    def release(self, shard: Dict[str, Any], error: str):
+        """Give a shard back after an error, or fail it for good once max_attempts is reached."""
+        self.conn.execute(
+            "UPDATE shards SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, lease_until = NULL, error = ? WHERE id = ? AND token = ? AND state = 'leased'",
+            (self.max_attempts, error, shard["id"], shard["token"]))
+
+    def status(self) -> Dict[str, Any]:
+        counts = dict(self.conn.execute("SELECT state, COUNT(*) FROM shards GROUP BY state").fetchall())
+        return {"shards": sum(counts.values()), **counts, "merged": self.meta("merged_into")}
+
+    def merge(self, output_path: str, dead_letter_path: str, summary_path: Optional[str] = None) -> bool:
+        """Combine the shard outputs into output_path, once.
+
+        With summary_path, the shards' summaries are merged into it too (a
+        shard written without one is summarized from its output). Returns False without writing anything while shards are still
+        pending or leased, or if the run was already merged. The queue is
+        locked for the whole merge, so concurrent merges cannot both run.
+        """
+        from src.candidate_store import concat_candidates
+        from src.retry import write_dead_letter
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            merged = self.meta("merged_into")
+            if merged is not None:
+                self.conn.execute("COMMIT")
+                self.logger.info(f"Already merged into {merged}")
+                return False
+            open_shards = self.conn.execute(
+                "SELECT COUNT(*) FROM shards WHERE state IN ('pending', 'leased')").fetchone()[0]
+            if open_shards:
+                self.conn.execute("COMMIT")
+                self.logger.warning(f"{open_shards} shards are not finished yet, nothing merged")
+                return False
+            rows = self.conn.execute("SELECT id, files, state, output, dead_letter, error FROM shards "
+                                     "ORDER BY id").fetchall()
+            outputs = [output for _, _, state, output, _, _ in rows if state == "done"]
+            dead_letter = []
+            for _, files, state, _, shard_dead_letter, error in rows:
+                if state == "failed":
+                    dead_letter += [{"cv": file, "reason": f"shard failed: {error}"} for file in json.loads(files)]
+                elif os.path.exists(shard_dead_letter):
+                    with open(shard_dead_letter) as f:
+                        dead_letter += [json.loads(line) for line in f]
+            # Written aside and renamed, so output_path is never left half written
+            partial = f"{output_path}.partial{os.path.splitext(output_path)[1]}"
+            concat_candidates(outputs, partial)
+            os.replace(partial, output_path)
+            if summary_path and outputs:
+                merge_shard_summaries(outputs).save(summary_path)
+            write_dead_letter(dead_letter_path, dead_letter)
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('merged_into', ?)", (output_path,))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.logger.info(f"Merged {len(outputs)} shards into {output_path}, {len(dead_letter)} CVs dead-lettered")
+        return True
+
+    def close(self):
+        self.conn.close()
+
+
+class LeaseKeeper:
+    """Renews a shard's lease from a background thread while the shard is processed."""
+
+    def __init__(self, queue: WorkQueue, shard: Dict[str, Any]):
+        self.queue = queue
+        self.shard = shard
+        self.stopped = threading.Event()
+        self.lost = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        conn = self.queue._connect()
+        try:
+            while not self.stopped.wait(self.queue.lease_seconds / 3):
+                if not self.queue.renew(self.shard, conn):
+                    self.lost = True
+                    self.queue.logger.warning(f"Lost the lease on shard {self.shard['id']}")
+                    return
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+def run_worker(queue: WorkQueue, agent, max_shards: Optional[int] = None, poll_seconds: float = 0.0) -> int:
+    """Claim and extract shards until the queue is drained, returns the shards completed.
+
+    Each shard runs through agent.run_files and is written to its own
+    partial output, with its summary next to it for merge(). With poll_seconds, an empty queue is polled until every
+    shard is done, so shards whose holder dies are picked up here.
+    """
+    worker = worker_id()
+    completed = 0
+    while max_shards is None or completed < max_shards:
+        shard = queue.claim(worker)
+        if shard is None:
+            status = queue.status()
+            if poll_seconds and status.get("leased"):
+                sleep(poll_seconds)
+                continue
+            break
+        paths = queue.shard_paths(shard)
+        agent.data_path, agent.dead_letter_path, agent.summary_path = paths["output"], paths["dead_letter"], paths["summary"]
+        queue.logger.info(f"{worker} extracting shard {shard['id']} ({len(shard['files'])} PDFs)")
+        try:
+            with LeaseKeeper(queue, shard):
+                agent.run_files(shard["files"])
+        except Exception as e:
+            queue.logger.error(f"Shard {shard['id']} failed: {e}")
+            queue.release(shard, str(e))
+            continue
+        if queue.complete(shard, paths["output"], paths["dead_letter"]):
+            completed += 1
+            metrics.inc("shards_completed_total")
+        else:
+            # Someone else holds the shard now, their output is the one that counts
+            queue.logger.warning(f"Shard {shard['id']} was taken over, discarding this worker's output")
+            for path in paths.values():
+                if os.path.exists(path):
+                    os.remove(path)
+    return completed
+
+
+if __name__ == "__main__":
+    import argparse
+    import subprocess
+    import sys
+    import tempfile
+
+    from src.candidate_store import load_candidates
+    from src.summary import CandidateSummary, summarize_file
+    from src.synthetic_cvs import generate_corpus
+
+    parser = argparse.ArgumentParser(description="Run a sharded extraction with local worker processes and the "
+                                                 "fake backend, killing some workers mid-shard")
+    parser.add_argument("--count", type=int, default=200, help="Synthetic CVs")
+    parser.add_argument("--shard_size", type=int, default=10)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--kill", type=int, default=1, help="Workers killed while holding a lease")
+    parser.add_argument("--lease", type=float, default=3.0, help="Lease seconds")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake backend seconds per call")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # The CLI as a module from the repository root, whatever the caller's directory and PYTHONPATH
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    main = [sys.executable, "-m", "src.main"]
+    env = dict(os.environ, PYTHONPATH=root)
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, "cvs")
+        generate_corpus(corpus, args.count, min_pages=1, max_pages=3, seed=19)
+        queue_path = os.path.join(tmp, "queue.sqlite")
+        data_path = os.path.join(tmp, "merged.arrow")
+        common = ["--queue", queue_path, "--lease", str(args.lease), "--data", data_path]
+        worker_args = ["--backend", "fake", "--fake_latency", str(args.latency), "--max_batch_cvs", "5"]
+        subprocess.run(main + ["plan", corpus, "--shard_size", str(args.shard_size)] + common,
+                       check=True, env=env, cwd=root)
+
+        start = time()
+        workers = [subprocess.Popen(main + ["work", "--poll", str(args.lease / 3)] + common + worker_args,
+                                    stderr=subprocess.DEVNULL, env=env, cwd=root) for _ in range(args.processes)]
+        # Kill workers once they hold a lease, leaving their shards to expire
+        queue = WorkQueue(queue_path, args.lease)
+        for victim in workers[:args.kill]:
+            while not queue.status().get("leased"):
+                sleep(0.05)
+            sleep(args.latency)
+            victim.kill()
+        # Survivors keep polling until the expired shards are redone
+        for worker in workers:
+            worker.wait()
+        summary_path = os.path.join(tmp, "summary.json")
+        subprocess.run(main + ["merge", "--dead_letter", os.path.join(tmp, "dead_letter.jsonl"),
+                        "--summary", summary_path] + common, check=True, stderr=subprocess.DEVNULL, env=env, cwd=root)
+        elapsed = time() - start
+        status = queue.status()
+        rows = len(load_candidates(data_path, ["university"]))
+        # The merged shard summaries describe exactly the merged rows
+        summary_matches = (CandidateSummary.load(summary_path).column_stats()["university"].counts
+                           == summarize_file(data_path).column_stats()["university"].counts)
+        leases = queue.conn.execute("SELECT SUM(attempts) FROM shards").fetchone()[0]
+        print(json.dumps({"cvs": args.count, "rows": rows, "seconds": round(elapsed, 2),
+                          "killed_workers": args.kill, "leases": leases,
+                          "summary_matches": summary_matches, **status}, indent=2))
+        queue.close()
+        raise SystemExit(0 if rows == args.count and status.get("done") == status["shards"] and summary_matches else 1)
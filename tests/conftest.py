@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src.init_agent import ExtractAgent  # noqa: E402
+from src.synthetic_cvs import generate_corpus  # noqa: E402
+
+FIELDS = ["university", "age", "college", "gender", "experience", "department", "degrees"]
+
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory):
+    """Twenty synthetic CVs of one to three pages, with their ground truth in file order."""
+    out_dir = str(tmp_path_factory.mktemp("cvs"))
+    truth = generate_corpus(out_dir, count=20, min_pages=1, max_pages=3, seed=7)
+    return out_dir, truth
+
+
+@pytest.fixture
+def make_agent(tmp_path):
+    """ExtractAgent on the fake backend writing into tmp_path, no backoff between retries."""
+    def make(name: str = "run", **options) -> ExtractAgent:
+        options.setdefault("backend", "fake")
+        options.setdefault("backoff_base", 0.0)
+        return ExtractAgent(data_path=str(tmp_path / f"{name}.arrow"),
+                            dead_letter_path=str(tmp_path / f"{name}.dead_letter.jsonl"), **options)
+    return make
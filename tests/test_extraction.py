@@ -0,0 +1,83 @@
+import json
+import os
+
+from src.candidate_store import load_candidates
+from src.synthetic_cvs import write_pdf
+
+from conftest import FIELDS
+
+
+def extracted(path):
+    return load_candidates(path, columns=FIELDS).astype(object).to_dict("records")
+
+
+def expected(truth):
+    return [{field: cv[field] for field in FIELDS} for cv in truth]
+
+
+def read_dead_letter(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def poisoned_corpus(corpus, tmp_path):
+    """The corpus files with a CV the model always rejects in the middle and an unreadable one at the end."""
+    out_dir, truth = corpus
+    files = [cv["file"] for cv in truth]
+    poisoned = str(tmp_path / "poisoned.pdf")
+    write_pdf(poisoned, ["POISON\nUniversity: Cairo University\nAge: 30"])
+    broken = str(tmp_path / "broken.pdf")
+    with open(broken, "wb") as f:
+        f.write(b"not a pdf")
+    return files[:7] + [poisoned] + files[7:] + [broken], poisoned, broken
+
+
+def test_rows_follow_input_order(corpus, make_agent):
+    _, truth = corpus
+    # Uneven batches finishing out of order, on a file list that is not sorted
+    agent = make_agent(concurrency=4, token_budget=1500, backend_options={"latency_per_1k_tokens": 0.05})
+    files = [cv["file"] for cv in reversed(truth)]
+    assert agent.run_files(files) == len(truth)
+    assert extracted(agent.data_path) == expected(reversed(truth))
+
+
+def test_bisection_isolates_poisoned_cv(corpus, make_agent, tmp_path):
+    _, truth = corpus
+    files, poisoned, _ = poisoned_corpus(corpus, tmp_path)
+    agent = make_agent(max_batch_cvs=10, backend_options={"fail_on": ["POISON"], "fail_status": 400})
+    assert agent.run_files(files) == len(truth)
+    # Its neighbours in the same batch were still extracted, in order
+    assert extracted(agent.data_path) == expected(truth)
+    assert poisoned in {entry["cv"] for entry in read_dead_letter(agent.dead_letter_path)}
+
+
+def test_dead_letter_lists_every_lost_cv_with_its_reason(corpus, make_agent, tmp_path):
+    files, poisoned, broken = poisoned_corpus(corpus, tmp_path)
+    agent = make_agent(backend_options={"fail_on": ["POISON"], "fail_status": 400})
+    agent.run_files(files)
+    entries = {entry["cv"]: entry["reason"] for entry in read_dead_letter(agent.dead_letter_path)}
+    assert set(entries) == {poisoned, broken}
+    assert entries[broken].startswith("could not read PDF")
+    assert "POISON" in entries[poisoned]
+
+
+def test_resume_matches_a_full_run(corpus, make_agent, tmp_path):
+    _, truth = corpus
+    files = [cv["file"] for cv in truth]
+    journal = str(tmp_path / "journal.jsonl")
+    full = make_agent("full")
+    full.run_files(files)
+
+    # First run loses every Japan University CV, the resumed one must only send those
+    first = make_agent("first", journal_path=journal, backend_options={"fail_on": ["Japan University"]})
+    written = first.run_files(files)
+    failed = {entry["cv"] for entry in read_dead_letter(first.dead_letter_path)}
+    assert failed == {cv["file"] for cv in truth if cv["university"] == "Japan University"}
+    assert 0 < len(failed) < len(truth) and written == len(truth) - len(failed)
+    assert any(cv["university"] == "Cairo University" for cv in truth)
+
+    # CVs already journaled would fail if they were sent again
+    resumed = make_agent("resumed", journal_path=journal, backend_options={"fail_on": ["Cairo University"]})
+    assert resumed.run_files(files, resume=True) == len(truth)
+    assert not os.path.exists(resumed.dead_letter_path)
+    assert extracted(resumed.data_path) == extracted(full.data_path) == expected(truth)
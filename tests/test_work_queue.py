@@ -0,0 +1,38 @@
+from time import sleep
+
+from src.candidate_store import load_candidates
+from src.work_queue import WorkQueue, run_worker
+
+
+def test_expired_lease_is_reclaimed_and_fences_the_old_holder(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0.1)
+    queue.plan(["a.pdf", "b.pdf"], shard_size=2)
+    stalled = queue.claim("stalled")
+    assert stalled["token"] == 1
+    # Still leased: nothing to claim
+    assert queue.claim("other") is None
+
+    sleep(0.2)
+    taken = queue.claim("other")
+    assert (taken["id"], taken["token"]) == (stalled["id"], stalled["token"] + 1)
+    # The old holder can neither renew nor publish once it lost the lease
+    assert not queue.renew(stalled)
+    assert not queue.complete(stalled, "stale.arrow", "stale.jsonl")
+    assert queue.complete(taken, "out.arrow", "out.jsonl")
+    assert queue.status()["done"] == 1
+
+
+def test_worker_reclaims_a_dead_workers_shard(corpus, make_agent, tmp_path):
+    _, truth = corpus
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0.2)
+    queue.plan([cv["file"] for cv in truth], shard_size=5)
+    # A worker claims the first shard and dies without releasing it
+    dead = queue.claim("dead")
+    sleep(0.3)
+
+    assert run_worker(queue, make_agent("worker")) == 4
+    assert queue.status()["done"] == 4
+    assert not queue.complete(dead, "stale.arrow", "stale.jsonl")
+    output, dead_letter = str(tmp_path / "merged.arrow"), str(tmp_path / "merged.dead_letter.jsonl")
+    assert queue.merge(output, dead_letter)
+    assert load_candidates(output, columns=["age"])["age"].tolist() == [cv["age"] for cv in truth]